@@ -1,14 +1,66 @@
 from dataclasses import asdict, is_dataclass
 
 import tomllib
-from flask import Flask
+from flask import Flask, current_app
+from flask.ctx import RequestContext, _AppCtxGlobals
+from flask.globals import request_ctx
+from flask.sessions import SecureCookieSessionInterface
 from flask_cors import CORS
 
-from . import db, error_handlers, models
+from . import cache, db, error_handlers, metrics, models, passwords, ratelimit
 from .blueprints import blueprints
+from .blueprints.utils import session_free
+
+
+class LazyGlobals(_AppCtxGlobals):
+    # attributes with a registered loader are resolved on first access and then kept
+    def __getattr__(self, name):
+        if (loader := current_app.lazy_globals.get(name)) is None:
+            return super().__getattr__(name)
+        value = loader()
+        setattr(self, name, value)
+        return value
+
+    def get(self, name, default=None):
+        if name in self.__dict__ or name not in current_app.lazy_globals:
+            return super().get(name, default)
+        return getattr(self, name)
+
+    def __contains__(self, item):
+        return super().__contains__(item) or item in current_app.lazy_globals
+
+
+class MatchOnceRequestContext(RequestContext):
+    # SessionInterface matches the URL before flask does, the second match is skipped
+    def match_request(self):
+        if self.request.url_rule is None and self.request.routing_exception is None:
+            super().match_request()
+
+
+class SessionInterface(SecureCookieSessionInterface):
+    def open_session(self, app, request):
+        # CORS preflights and session free views get a null session without the cookie
+        # being read; flask opens the session before routing, so the URL is matched here
+        if request.method == "OPTIONS":
+            return None
+        request_ctx.match_request()
+        if getattr(app.view_functions.get(request.endpoint), "session_free", False):
+            return None
+        return super().open_session(app, request)
 
 
 class FlaskApp(Flask):
+    app_ctx_globals_class = LazyGlobals
+    session_interface = SessionInterface()
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # name -> callable, see LazyGlobals
+        self.lazy_globals = {}
+
+    def request_context(self, environ):
+        return MatchOnceRequestContext(self, environ)
+
     def make_response(self, rv):
         if is_dataclass(rv):
             rv = asdict(rv)
@@ -32,6 +84,9 @@ def create_app(config=None):
     )
 
     db.setup_app(app)
+    cache.setup_app(app)
+    passwords.setup_app(app)
+    ratelimit.setup_app(app)
     models.setup_app(app)
     error_handlers.setup_app(app)
 
@@ -39,9 +94,15 @@ def create_app(config=None):
         app.register_blueprint(blueprint)
 
     @app.route("/heartbeat")
+    @session_free
     def heartbeat():
         return ""
 
+    @app.route("/metrics")
+    @session_free
+    def metrics_():
+        return metrics.REGISTRY.render(), {"Content-Type": metrics.CONTENT_TYPE}
+
     @app.after_request
     def apply_security_headers(response):
         #response.headers["Strict-Transport-Security"] = "max-age=31536000; includeSubDomains"
@@ -4,14 +4,15 @@ from argon2.exceptions import VerifyMismatchError
 from flask import Blueprint, abort, g, request, session
 from pydantic import BaseModel
 
-from app.constants import PASSWORD_HASHER
 from app.models.types import NewPassword
 from app.models.user import (
     get_user_by_id,
     get_user_by_name,
-    update_user_last_login,
+    record_user_last_login,
     update_user_password,
 )
+from app.passwords import get_password_hasher
+from app.ratelimit import login_allowed
 
 blueprint = Blueprint("auth", __name__, url_prefix="/auth")
 
@@ -26,16 +27,19 @@ def login():
     form = LoginForm(**request.form)
     username = form.username
     password = form.password
+    if not login_allowed(username, request.remote_addr):
+        abort(HTTPStatus.TOO_MANY_REQUESTS)
     user = get_user_by_name(username)
     if not user:
         abort(HTTPStatus.UNAUTHORIZED)
 
     password_hash = user.password_hash
+    hasher = get_password_hasher()
     try:
-        PASSWORD_HASHER.verify(password_hash, password)
+        hasher.verify(password_hash, password)
     except VerifyMismatchError:
         abort(HTTPStatus.UNAUTHORIZED)
-    if PASSWORD_HASHER.check_needs_rehash(password_hash):
+    if hasher.check_needs_rehash(password_hash):
         update_user_password(user.id, password)
     session["user"] = {
         "id": user.id,
@@ -43,7 +47,7 @@ def login():
         "username": user.username,
         "password_reset_required": user.password_reset_required,
     }
-    update_user_last_login(user.id)
+    record_user_last_login(user.id)
     return ("", HTTPStatus.NO_CONTENT)
 
 
@@ -71,16 +75,18 @@ def change_password():
     user_id = g.user["id"]
     user = get_user_by_id(user_id)
     try:
-        PASSWORD_HASHER.verify(user.password_hash, old_password)
+        get_password_hasher().verify(user.password_hash, old_password)
     except VerifyMismatchError:
         abort(HTTPStatus.UNAUTHORIZED)
     update_user_password(user_id, new_password)
     return ("", HTTPStatus.NO_CONTENT)
 
 
-@blueprint.before_app_request
 def load_current_user():
-    if user := session.get("user"):
-        g.user = user
-    else:
-        g.user = None
+    return session.get("user")
+
+
+@blueprint.record_once
+def register_current_user(state):
+    # g.user is loaded the first time a view or login_required reads it
+    state.app.lazy_globals["user"] = load_current_user
@@ -1,32 +1,45 @@
+from datetime import datetime, timezone
 from http import HTTPStatus
-from typing import Annotated
+from typing import Annotated, Any
 
-from flask import Blueprint, g, request
-from pydantic import BaseModel, Field
+from flask import Blueprint, current_app, g, request, stream_with_context
+from pydantic import AfterValidator, BaseModel, Field, TypeAdapter, ValidationError, field_validator
+from pydantic_core import PydanticCustomError
 from pymysql.err import IntegrityError
 
-from app.blueprints.utils import login_required
+from app.blueprints.utils import conditional_response, if_match_version, login_required
+from app.constants import DEFAULT_PAGE_SIZE, MAX_BULK_ITEMS, MAX_PAGE_SIZE, MAX_QUANTITY
 from app.db import NotFoundError
 from app.models.item import (
+    ExportFormat,
     create_item,
     create_item_comment,
     create_item_tag,
     create_item_tag_association,
+    create_many_items,
     delete_item_tag_association,
+    export_items,
     get_all_item_tags,
-    get_all_item_comment_revisions_by_origin_id,
-    get_all_item_revisions_by_origin_id,
-    get_all_joined_items,
+    get_all_item_comment_revisions_page,
+    get_all_item_revisions_page,
+    get_all_items_as_of_page,
+    get_all_joined_items_page,
+    get_item_changes,
+    get_item_collection_validator,
     get_item_tag_by_name,
+    get_item_validator,
     get_joined_item_by_id,
     update_item_by_id,
     update_item_comment_by_id,
     update_item_comment_deletion_flag_by_id,
     update_item_deletion_flag_by_id,
+    update_item_quantity_by_id,
 )
 
 blueprint = Blueprint("item", __name__, url_prefix="/items")
 
+EXPORT_MIMETYPES = {ExportFormat.NDJSON: "application/x-ndjson", ExportFormat.CSV: "text/csv"}
+
 
 class ItemForm(BaseModel):
     name: str
@@ -35,6 +48,17 @@ class ItemForm(BaseModel):
     unit: str | None = None
 
 
+class ItemQuantityForm(BaseModel):
+    delta: Annotated[int, Field(ge=-MAX_QUANTITY, le=MAX_QUANTITY)]
+
+    @field_validator("delta")
+    @classmethod
+    def check_delta(cls, value):
+        if not value:
+            raise PydanticCustomError("zero_delta", "Delta must not be zero")
+        return value
+
+
 class ItemTagForm(BaseModel):
     name: str
 
@@ -43,6 +67,45 @@ class ItemCommentForm(BaseModel):
     text: str
 
 
+# rows are validated one by one so a bad row is reported instead of failing the batch
+validate_bulk_items = TypeAdapter(
+    Annotated[list[Any], Field(min_length=1, max_length=MAX_BULK_ITEMS)]
+).validate_python
+
+
+class ChangesQuery(BaseModel):
+    since: Annotated[str, Field(pattern=r"^\d+\.\d+(?:\.\d+)?$", default="0.0.0")]
+
+
+class ExportQuery(BaseModel):
+    format: ExportFormat = ExportFormat.NDJSON
+
+
+class PageQuery(BaseModel):
+    after: Annotated[int, Field(ge=0, default=0)]
+    limit: Annotated[int, Field(ge=1, le=MAX_PAGE_SIZE, default=DEFAULT_PAGE_SIZE)]
+
+
+def as_naive_utc(value):
+    # revision times are stored as naive UTC, naive input is taken to be UTC already
+    if value.tzinfo is None:
+        return value
+    return value.astimezone(timezone.utc).replace(tzinfo=None)
+
+
+UtcDatetime = Annotated[datetime, AfterValidator(as_naive_utc)]
+
+
+class ItemsQuery(PageQuery):
+    as_of: UtcDatetime | None = None
+
+
+class RevisionQuery(PageQuery):
+    # since is inclusive and until exclusive, so consecutive windows do not overlap
+    since: UtcDatetime | None = None
+    until: UtcDatetime | None = None
+
+
 @blueprint.post("/")
 @login_required
 def create_item_():
@@ -52,24 +115,98 @@ def create_item_():
     return {"id": item_id}
 
 
+@blueprint.post("/bulk")
+@login_required
+def create_items_bulk():
+    valid_indexes = []
+    valid_items = []
+    errors = []
+    for index, payload in enumerate(validate_bulk_items(request.json)):
+        try:
+            form = ItemForm.model_validate(payload)
+        except ValidationError as err:
+            errors.append({"index": index, "errors": err.errors(include_url=False)})
+        else:
+            valid_indexes.append(index)
+            valid_items.append(tuple(form.model_dump().values()))
+
+    ids = [None] * len(request.json)
+    for index, item_id in zip(
+        valid_indexes, create_many_items(g.user["id"], valid_items), strict=True
+    ):
+        if item_id is None:
+            duplicate = {"type": "duplicate", "loc": ["name"], "msg": "Name already exists"}
+            errors.append({"index": index, "errors": [duplicate]})
+        ids[index] = item_id
+    errors.sort(key=lambda error: error["index"])
+    return {"ids": ids, "errors": errors}
+
+
 @blueprint.get("/")
 @login_required
 def get_items():
-    return get_all_joined_items()
+    page_query = ItemsQuery(**request.args)
+    if page_query.as_of:
+        # history can still change under the settle window and archiving, so no caching
+        return get_all_items_as_of_page(page_query.as_of, page_query.after, page_query.limit)
+    # read before the items, so the body is never older than its validator
+    validator = get_item_collection_validator()
+    return conditional_response(
+        f"items-{page_query.after}-{page_query.limit}-{validator}",
+        lambda: get_all_joined_items_page(page_query.after, page_query.limit),
+    )
+
+
+@blueprint.get("/changes")
+@login_required
+def get_item_changes_():
+    # best effort: revisions show up once CHANGES_SETTLE_SECONDS old, and one whose write
+    # transaction took longer than that to commit is never delivered; resync from a full
+    # listing when that matters
+    changes_query = ChangesQuery(**request.args)
+    # watermarks from before tags were tracked have two parts, their tags start over
+    return get_item_changes(*map(int, changes_query.since.split(".")))
+
+
+@blueprint.get("/export")
+@login_required
+def export_items_():
+    export_query = ExportQuery(**request.args)
+    # the request context, and with it the borrowed connection, lives until the body is sent
+    return current_app.response_class(
+        stream_with_context(export_items(export_query.format)),
+        mimetype=EXPORT_MIMETYPES[export_query.format],
+        headers={"Content-Disposition": f"attachment; filename=items.{export_query.format}"},
+    )
 
 
 @blueprint.get("/<item_id>")
 @login_required
 def get_item(item_id):
-    return get_joined_item_by_id(item_id)
+    validator = get_item_validator(item_id)
+    return conditional_response(
+        f"item-{item_id}-{validator}", lambda: get_joined_item_by_id(item_id)
+    )
 
 
 @blueprint.put("/<item_id>")
 @login_required
 def update_item(item_id):
     form = ItemForm(**request.form)
-    update_item_by_id(g.user["id"], item_id, *form.model_dump().values())
-    return ("", HTTPStatus.NO_CONTENT)
+    version = if_match_version("item", item_id)
+    validator = update_item_by_id(
+        g.user["id"], item_id, *form.model_dump().values(), version=version
+    )
+    response = current_app.response_class(status=HTTPStatus.NO_CONTENT)
+    response.set_etag(f"item-{item_id}-{validator}")
+    return response
+
+
+@blueprint.patch("/<item_id>/quantity")
+@login_required
+def update_item_quantity(item_id):
+    form = ItemQuantityForm(**request.form)
+    return update_item_quantity_by_id(g.user["id"], item_id, form.delta)
 
 
 @blueprint.delete("/<item_id>")
@@ -82,7 +219,8 @@ def delete_item(item_id):
 @blueprint.get("/<item_id>/revision/")
 @login_required
 def get_item_revisions(item_id):
-    return get_all_item_revisions_by_origin_id(item_id)
+    revision_query = RevisionQuery(**request.args)
+    return get_all_item_revisions_page(item_id, **revision_query.model_dump())
 
 
 @blueprint.post("/<item_id>/tags/")
@@ -138,12 +276,11 @@ def create_item_comment_(item_id):
 @login_required
 def update_item_comment(comment_id):
     form = ItemCommentForm(**request.form)
-    try:
-        update_item_comment_by_id(g.user["id"], comment_id, form.text)
-    except IntegrityError as err:
-        if "FOREIGN KEY" in str(err):
-            return ("", HTTPStatus.NOT_FOUND)
-    return ("", HTTPStatus.NO_CONTENT)
+    version = if_match_version("comment", comment_id)
+    version = update_item_comment_by_id(g.user["id"], comment_id, form.text, version=version)
+    response = current_app.response_class(status=HTTPStatus.NO_CONTENT)
+    response.set_etag(f"comment-{comment_id}-{version}")
+    return response
 
 
 @blueprint.delete("/comments/<comment_id>")
@@ -157,5 +294,5 @@ def delete_item_comment(comment_id):
 @blueprint.get("/comments/<int:comment_id>/revision/")
 @login_required
 def get_item_comment_revisions(comment_id):
-    result = get_all_item_comment_revisions_by_origin_id(comment_id)
-    return result
+    revision_query = RevisionQuery(**request.args)
+    return get_all_item_comment_revisions_page(comment_id, **revision_query.model_dump())
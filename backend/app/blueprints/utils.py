@@ -1,15 +1,49 @@
 from functools import wraps
 from http import HTTPStatus
 
-from flask import abort, g
+from flask import abort, current_app, g, make_response, request
+
+from app.cache import cached_response
+from app.db import VersionMismatchError
 
 
 def login_required(view):
     @wraps(view)
     def wrapped_view(**kwargs):
-        #if g.user is None or g.user["password_reset_required"]:
+        # if g.user is None or g.user["password_reset_required"]:
         if g.user is None:
             abort(HTTPStatus.UNAUTHORIZED)
         return view(**kwargs)
 
     return wrapped_view
+
+
+def session_free(view):
+    # the session cookie is never read for this view, g.user is always None
+    view.session_free = True
+    return view
+
+
+def conditional_response(etag, producer):
+    if request.if_none_match.contains(etag):
+        response = current_app.response_class(status=HTTPStatus.NOT_MODIFIED)
+    else:
+        # keyed by the validator, so a cached body never outlives the state it was built from
+        response = make_response(cached_response(etag, producer))
+    response.set_etag(etag)
+    return response
+
+
+def if_match_version(kind, resource_id):
+    # None for unconditional requests, otherwise the version an If-Match ETag was issued for:
+    # the field after the id, the rest covers related rows that do not make an edit conflict
+    if not request.if_match or request.if_match.star_tag:
+        return None
+    for etag in request.if_match:
+        match etag.split("-"):
+            case [tag_kind, tag_id, version, *_] if (
+                tag_kind == kind and tag_id == str(resource_id) and version.isdigit()
+            ):
+                return int(version)
+    # none of the tags was issued for this resource, so none can match
+    raise VersionMismatchError
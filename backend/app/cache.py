@@ -0,0 +1,89 @@
+import threading
+from collections import OrderedDict
+from dataclasses import asdict, is_dataclass
+
+from flask import current_app, g
+
+from app.db import transaction
+from app.metrics import REGISTRY
+
+# tables whose contents end up in the cached item representations
+CACHED_TABLES = frozenset(("item", "item_tag_junction", "item_tag", "item_comment"))
+
+CACHE_REQUESTS = REGISTRY.counter(
+    "response_cache_requests_total", "Response cache lookups by result.", ("result",)
+)
+CACHE_EVICTIONS = REGISTRY.counter(
+    "response_cache_evictions_total", "Entries evicted to stay under the memory bound."
+)
+
+
+class ResponseCache:
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.size = 0
+        # bumped on every invalidation, fills computed before a bump are discarded
+        self.generation = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            if (body := self._entries.get(key)) is not None:
+                self._entries.move_to_end(key)
+            return body
+
+    def set(self, key, body, generation):
+        if len(body) > self.max_bytes:
+            return
+        with self._lock:
+            if generation != self.generation:
+                return
+            if (previous := self._entries.pop(key, None)) is not None:
+                self.size -= len(previous)
+            self._entries[key] = body
+            self.size += len(body)
+            while self.size > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self.size -= len(evicted)
+                CACHE_EVICTIONS.inc()
+
+    def invalidate(self):
+        with self._lock:
+            self.generation += 1
+            self._entries.clear()
+            self.size = 0
+
+    def table_written(self, table):
+        if table in CACHED_TABLES:
+            self.invalidate()
+
+
+def cached_response(key, producer):
+    cache = current_app.extensions["response_cache"]
+    # inside a transaction the result may include uncommitted writes of our own
+    if not cache.max_bytes or g.get("in_transaction"):
+        return producer()
+
+    if (body := cache.get(key)) is not None:
+        CACHE_REQUESTS.inc(result="hit")
+        return current_app.response_class(body, mimetype="application/json")
+    CACHE_REQUESTS.inc(result="miss")
+
+    # the generation is read before the transaction starts its snapshot, so a write
+    # committed in between invalidates and this fill is dropped instead of going stale
+    generation = cache.generation
+    with transaction():
+        result = producer()
+    if is_dataclass(result):
+        result = asdict(result)
+    response = current_app.json.response(result)
+    cache.set(key, response.get_data(), generation)
+    return response
+
+
+def setup_app(app):
+    # 0 disables; writes only invalidate the cache of the process that made them, the
+    # item views key entries by a database validator so other processes never see stale bodies
+    app.config.setdefault("RESPONSE_CACHE_MAX_BYTES", 0)
+    app.extensions["response_cache"] = ResponseCache(app.config["RESPONSE_CACHE_MAX_BYTES"])
@@ -1,5 +1,9 @@
-from argon2 import PasswordHasher
+MIN_PASSWORD_LENGTH = 12
 
-PASSWORD_HASHER = PasswordHasher()
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
 
-MIN_PASSWORD_LENGTH = 12
+MAX_BULK_ITEMS = 5000
+
+# the signed INTEGER quantity column
+MAX_QUANTITY = 2**31 - 1
@@ -1,5 +1,11 @@
+import random
+import re
+import threading
+import time
 from contextlib import contextmanager
-from enum import StrEnum
+from dataclasses import dataclass
+from functools import wraps
+from pathlib import Path
 
 import click
 
@@ -7,6 +13,8 @@ import pymysql
 from flask import current_app, g
 from flask.cli import AppGroup
 
+from app.metrics import REGISTRY
+
 db_cli = AppGroup("db")
 
 
@@ -22,24 +30,207 @@ class DuplicateError(DatabaseError):
     pass
 
 
+class PoolExhaustedError(DatabaseError):
+    pass
+
+
+class InsufficientQuantityError(DatabaseError):
+    pass
+
+
+class VersionMismatchError(DatabaseError):
+    pass
+
+
+POOL_DEFAULTS = {
+    "DATABASE_POOL_MIN_SIZE": 1,
+    "DATABASE_POOL_MAX_SIZE": 10,
+    # seconds a checkout waits for a connection when the pool is at max size
+    "DATABASE_POOL_TIMEOUT": 5,
+    # seconds an idle connection above the min size is kept around
+    "DATABASE_POOL_IDLE_TIMEOUT": 300,
+    # seconds after which a connection is retired regardless of use
+    "DATABASE_POOL_MAX_LIFETIME": 3600,
+    # seconds a statement waits for a row lock, well under MariaDB's 50 so that a blocked
+    # write gives up long before CHANGES_SETTLE_SECONDS passes
+    "DATABASE_LOCK_WAIT_TIMEOUT": 10,
+}
+
+RETRY_DEFAULTS = {
+    # extra attempts after a deadlock or lock wait timeout, 0 leaves retrying off
+    "TRANSACTION_RETRY_ATTEMPTS": 0,
+    # seconds, the wait before retry n is drawn from [0, min(max delay, base delay * 2 ** n))
+    "TRANSACTION_RETRY_BASE_DELAY": 0.05,
+    "TRANSACTION_RETRY_MAX_DELAY": 1,
+}
+
+# MariaDB error codes that leave nothing behind but a rolled back statement or transaction
+RETRYABLE_ERRORS = {
+    1205: "lock_wait_timeout",
+    1213: "deadlock",
+}
+
+TRANSACTION_RETRIES = REGISTRY.counter(
+    "db_transaction_retries_total", "Units of work retried after transient contention.", ("reason",)
+)
+
+
+@dataclass
+class PooledConnection:
+    connection: pymysql.Connection
+    created_at: float
+    returned_at: float | None = None
+
+
+class ConnectionPool:
+    def __init__(
+        self, connect, *, min_size=1, max_size=10, timeout=5, idle_timeout=300, max_lifetime=3600
+    ):
+        self.connect = connect
+        self.min_size = min_size
+        self.max_size = max_size
+        self.timeout = timeout
+        self.idle_timeout = idle_timeout
+        self.max_lifetime = max_lifetime
+        # most recently returned connections are at the end
+        self._idle = []
+        self._in_use = {}
+        self._opening = 0
+        self._condition = threading.Condition()
+
+    @property
+    def size(self):
+        return len(self._idle) + len(self._in_use) + self._opening
+
+    def acquire(self):
+        deadline = time.monotonic() + self.timeout
+        with self._condition:
+            while True:
+                self._evict_expired()
+                if self._idle:
+                    pooled = self._idle.pop()
+                    break
+                if self.size < self.max_size:
+                    pooled = None
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise PoolExhaustedError
+                self._condition.wait(remaining)
+            # hold the slot while doing network I/O outside of the lock
+            self._opening += 1
+
+        try:
+            if pooled is not None and not self._is_alive(pooled.connection):
+                self._close(pooled.connection)
+                pooled = None
+            if pooled is None:
+                pooled = PooledConnection(self.connect(), time.monotonic())
+        finally:
+            with self._condition:
+                self._opening -= 1
+                if pooled is not None:
+                    self._in_use[id(pooled.connection)] = pooled
+                self._condition.notify()
+        return pooled.connection
+
+    def release(self, conn, discard=False):
+        # the connection keeps its slot until it is closed or idle again, otherwise a waiter
+        # could open another one in between and take the pool past max_size
+        pooled = self._in_use[id(conn)]
+        now = time.monotonic()
+        keep = not discard and now - pooled.created_at < self.max_lifetime
+        if keep:
+            try:
+                # end the implicit transaction so the next borrower gets a fresh snapshot
+                conn.rollback()
+            except pymysql.Error:
+                keep = False
+        if not keep:
+            self._close(conn)
+        with self._condition:
+            del self._in_use[id(conn)]
+            if keep:
+                pooled.returned_at = now
+                self._idle.append(pooled)
+            self._condition.notify()
+
+    def close(self):
+        with self._condition:
+            idle, self._idle = self._idle, []
+        for pooled in idle:
+            self._close(pooled.connection)
+
+    def _evict_expired(self):
+        now = time.monotonic()
+        keep = []
+        # most recently returned first, so the min size is filled with the warmest connections
+        for pooled in reversed(self._idle):
+            expired = now - pooled.created_at >= self.max_lifetime
+            idle_too_long = (
+                len(keep) + len(self._in_use) >= self.min_size
+                and now - pooled.returned_at >= self.idle_timeout
+            )
+            if expired or idle_too_long:
+                self._close(pooled.connection)
+            else:
+                keep.append(pooled)
+        self._idle = keep[::-1]
+
+    @staticmethod
+    def _is_alive(conn):
+        try:
+            conn.ping()
+        except pymysql.Error:
+            return False
+        return True
+
+    @staticmethod
+    def _close(conn):
+        try:
+            conn.close()
+        except pymysql.Error:
+            pass
+
+
+def connect(config):
+    return pymysql.connect(
+        host="localhost",
+        port=config["DATABASE_PORT"],
+        user=config["DATABASE_USER"],
+        password=config["DATABASE_PASSWORD"],
+        database=config["DATABASE"],
+        cursorclass=pymysql.cursors.DictCursor,
+        client_flag=pymysql.constants.CLIENT.MULTI_STATEMENTS,
+        init_command=(
+            f"SET SESSION innodb_lock_wait_timeout = {int(config['DATABASE_LOCK_WAIT_TIMEOUT'])}"
+        ),
+    )
+
+
 def get_db_connection():
     if "db_connection" not in g:
-        g.db_connection = pymysql.connect(
-            host="localhost",
-            port=current_app.config["DATABASE_PORT"],
-            user=current_app.config["DATABASE_USER"],
-            password=current_app.config["DATABASE_PASSWORD"],
-            database=current_app.config["DATABASE"],
-            cursorclass=pymysql.cursors.DictCursor,
-            client_flag=pymysql.constants.CLIENT.MULTI_STATEMENTS,
-        )
+        g.db_connection = current_app.extensions["db_pool"].acquire()
         g.in_transaction = False
     return g.db_connection
 
 
+def after_commit(callback):
+    # outside of a transaction the caller has already committed
+    if g.get("in_transaction"):
+        g.after_commit_callbacks.append(callback)
+    else:
+        callback()
+
+
 @contextmanager
 def transaction():
     conn = get_db_connection()
+    if g.in_transaction:
+        # join the enclosing transaction, it owns the commit and rollback
+        yield conn
+        return
+    g.after_commit_callbacks = []
     try:
         g.in_transaction = True
         conn.begin()
@@ -50,26 +241,112 @@ def transaction():
         raise
     finally:
         g.in_transaction = False
+        callbacks = g.pop("after_commit_callbacks")
+    # only reached when the commit went through
+    for callback in callbacks:
+        callback()
 
 
-class LockType(StrEnum):
-    READ = "READ"
-    WRITE = "WRITE"
+def _retry_reason(err):
+    return RETRYABLE_ERRORS.get(err.args[0]) if err.args else None
 
 
-@contextmanager
-def locked_tables(table_lock_type_pair: tuple["table name string", LockType], *additional_pairs):
-    conn = get_db_connection()
-    with conn.cursor() as cursor:
-        pairs = [" ".join(pair) for pair in (table_lock_type_pair, *additional_pairs)]
-        cursor.execute(f"LOCK TABLES {', '.join(pairs)};")
-        yield
-        cursor.execute("UNLOCK TABLES;")
+def _retry_delay(attempt):
+    config = current_app.config
+    ceiling = config["TRANSACTION_RETRY_BASE_DELAY"] * 2**attempt
+    return random.uniform(0, min(ceiling, config["TRANSACTION_RETRY_MAX_DELAY"]))
+
+
+def retrying(func):
+    # the whole call is run again, so everything it does before committing must be safe to
+    # repeat; calls made inside a transaction or another retrying call leave the retry to it
+    @wraps(func)
+    def inner(*args, **kwargs):
+        if g.get("in_transaction") or g.get("retrying"):
+            return func(*args, **kwargs)
+        g.retrying = True
+        attempts = current_app.config["TRANSACTION_RETRY_ATTEMPTS"]
+        try:
+            attempt = 0
+            while True:
+                try:
+                    return func(*args, **kwargs)
+                except pymysql.OperationalError as err:
+                    reason = _retry_reason(err)
+                    if reason is None or attempt >= attempts:
+                        raise
+                TRANSACTION_RETRIES.inc(reason=reason)
+                time.sleep(_retry_delay(attempt))
+                attempt += 1
+        finally:
+            g.retrying = False
+
+    return inner
 
 
 def close_db_connection(*_args, **_kwargs):
     if conn := g.pop("db_connection", None):
-        conn.close()
+        # a context torn down mid-transaction leaves the connection in an unknown state
+        in_transaction = g.pop("in_transaction", False)
+        current_app.extensions["db_pool"].release(conn, discard=in_transaction)
+
+
+MIGRATION_FILE_PATTERN = re.compile(r"^(\d+)_(\w+)\.sql$")
+
+
+@dataclass
+class Migration:
+    version: int
+    name: str
+    path: Path
+
+
+def execute_script(cursor, script):
+    cursor.execute(script)
+    # errors in later statements only surface while reading their results
+    while cursor.nextset():
+        pass
+
+
+def get_migrations():
+    migrations = []
+    for path in (Path(current_app.root_path) / "models" / "migrations").iterdir():
+        if match := MIGRATION_FILE_PATTERN.match(path.name):
+            migrations.append(Migration(int(match[1]), match[2], path))
+    return sorted(migrations, key=lambda migration: migration.version)
+
+
+def get_applied_migration_versions():
+    db = get_db_connection()
+    with db.cursor() as cursor:
+        cursor.execute(
+            "CREATE TABLE IF NOT EXISTS schema_migration ("
+            "version INTEGER PRIMARY KEY, "
+            "name VARCHAR(256) NOT NULL, "
+            "applied_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP"
+            ");"
+        )
+        cursor.execute("SELECT version FROM schema_migration;")
+        return {row["version"] for row in cursor.fetchall()}
+
+
+def migrate():
+    # DDL commits implicitly, so migrations can not be rolled back and must be safe to rerun
+    db = get_db_connection()
+    applied_versions = get_applied_migration_versions()
+    applied = []
+    for migration in get_migrations():
+        if migration.version in applied_versions:
+            continue
+        with db.cursor() as cursor:
+            execute_script(cursor, migration.path.read_text())
+            cursor.execute(
+                "INSERT INTO schema_migration (version, name) VALUES (%s, %s);",
+                (migration.version, migration.name),
+            )
+        db.commit()
+        applied.append(migration)
+    return applied
 
 
 def init_db():
@@ -77,8 +354,9 @@ def init_db():
     with current_app.open_resource("models/schema.sql") as file_obj:
         with db.cursor() as cursor:
             script = file_obj.read().decode("utf8")
-            cursor.execute(script)
+            execute_script(cursor, script)
     db.commit()
+    migrate()
 
 
 @db_cli.command("init")
@@ -87,6 +365,31 @@ def init_db_command():
     click.echo("Done.")
 
 
+@db_cli.command("migrate")
+def migrate_command():
+    for migration in migrate():
+        click.echo(f"Applied {migration.version:04} {migration.name}")
+    click.echo("Done.")
+
+
+@db_cli.command("status")
+def status_command():
+    applied_versions = get_applied_migration_versions()
+    for migration in get_migrations():
+        state = "applied" if migration.version in applied_versions else "pending"
+        click.echo(f"{migration.version:04} {migration.name} {state}")
+
+
 def setup_app(app):
+    for key, value in (POOL_DEFAULTS | RETRY_DEFAULTS).items():
+        app.config.setdefault(key, value)
+    app.extensions["db_pool"] = ConnectionPool(
+        lambda: connect(app.config),
+        min_size=app.config["DATABASE_POOL_MIN_SIZE"],
+        max_size=app.config["DATABASE_POOL_MAX_SIZE"],
+        timeout=app.config["DATABASE_POOL_TIMEOUT"],
+        idle_timeout=app.config["DATABASE_POOL_IDLE_TIMEOUT"],
+        max_lifetime=app.config["DATABASE_POOL_MAX_LIFETIME"],
+    )
     app.teardown_appcontext(close_db_connection)
     app.cli.add_command(db_cli)
@@ -2,13 +2,24 @@ from http import HTTPStatus
 
 from pydantic_core import ValidationError
 
-from app.db import NotFoundError, DuplicateError
+from app.db import (
+    DuplicateError,
+    InsufficientQuantityError,
+    NotFoundError,
+    PoolExhaustedError,
+    VersionMismatchError,
+)
+from app.passwords import HasherBusyError
 
 
 HANDLER_MAP = {
     ValidationError: (lambda error: (error.errors(include_url=False), HTTPStatus.BAD_REQUEST)),
     NotFoundError: (lambda _: ("", HTTPStatus.NOT_FOUND)),
     DuplicateError: (lambda _: ("", HTTPStatus.CONFLICT)),
+    InsufficientQuantityError: (lambda _: ("", HTTPStatus.CONFLICT)),
+    PoolExhaustedError: (lambda _: ("", HTTPStatus.SERVICE_UNAVAILABLE)),
+    VersionMismatchError: (lambda _: ("", HTTPStatus.PRECONDITION_FAILED)),
+    HasherBusyError: (lambda _: ("", HTTPStatus.SERVICE_UNAVAILABLE)),
 }
 
 def setup_app(app):
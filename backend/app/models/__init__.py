@@ -1,6 +1,6 @@
-from . import item, user
+from . import item, model, revision, user
 
-all_modules = (user, item)
+all_modules = (model, user, item, revision)
 
 
 def setup_app(app):
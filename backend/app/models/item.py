@@ -1,11 +1,50 @@
-from dataclasses import astuple, dataclass
-from datetime import datetime, timezone
-from itertools import groupby
-
+import csv
+import io
+import json
+from dataclasses import asdict, astuple, dataclass
+from datetime import datetime, timedelta, timezone
+from enum import StrEnum
+from itertools import groupby, islice
+from pathlib import Path
+
+import click
+from flask import current_app
+from flask.cli import AppGroup
+from pydantic import ValidationError
 from pymysql.err import IntegrityError
 
-from app.db import locked_tables, LockType, transaction, NotFoundError, DuplicateError
-from app.models.model import RevisionMixin, query
+from app.constants import DEFAULT_PAGE_SIZE, MAX_QUANTITY
+from app.db import (
+    retrying,
+    transaction,
+    NotFoundError,
+    DuplicateError,
+    InsufficientQuantityError,
+    VersionMismatchError,
+)
+from app.models.model import Page, RevisionMixin, query
+from app.models.types import ItemImportRow
+from app.models.user import get_user_by_name
+
+item_cli = AppGroup("item")
+
+EXPORT_CHUNK_SIZE = 64 * 1024
+
+EXPORT_CSV_FIELDS = ("id", "name", "description", "quantity", "unit", "tags", "comments")
+
+IMPORT_BATCH_SIZE = 500
+
+
+class AssemblyMode(StrEnum):
+    # one query, tags x comments rows per item deduplicated in python
+    JOIN = "join"
+    # one query per relation, stitched together by item id
+    SPLIT = "split"
+
+
+class ExportFormat(StrEnum):
+    NDJSON = "ndjson"
+    CSV = "csv"
 
 
 @dataclass
@@ -42,9 +81,43 @@ class ItemCommentRevision(RevisionMixin):
     text: str
 
 
+@dataclass
+class ItemCommentChange(ItemCommentRevision):
+    item_id: int
+
+
+@dataclass
+class ItemTagChange:
+    _id: int
+    _datetime: datetime
+    item_id: int
+    item_tag_id: int
+    name: str
+    # the tag was taken off the item, or deleted altogether
+    is_deleted: bool
+
+
+@dataclass
+class ItemChanges:
+    items: list[ItemRevision]
+    comments: list[ItemCommentChange]
+    tags: list[ItemTagChange]
+    # "<item revision _id>.<item comment revision _id>.<item tag revision _id>", pass back
+    # as "since"
+    watermark: str
+
+
+@dataclass
+class ItemSnapshot:
+    id: int
+    taken_at: datetime
+
+
 @dataclass
 class ItemCommentFull(ItemComment):
     has_revisions: bool
+    # pass back in If-Match as "comment-<id>-<version>" to update without overwriting
+    version: int
 
 
 @dataclass
@@ -54,6 +127,7 @@ class ItemFull(Item):
     has_revisions: bool
 
 
+@retrying
 @query
 def create_item(fire, user_id, name, description=None, quantity=0, unit=None):
     with transaction():
@@ -65,12 +139,159 @@ def create_item(fire, user_id, name, description=None, quantity=0, unit=None):
         return item_id
 
 
+@query
+def get_all_item_ids_by_names(fire, names):
+    return fire(tuple(names))
+
+
+@retrying
+@query
+def create_many_items(fire, user_id, items):
+    # items are (name, description, quantity, unit) tuples, the result lines up with them
+    # and holds None wherever the name already exists or repeats an earlier row
+    ids = [None] * len(items)
+    if not items:
+        return ids
+    names = [item[0] for item in items]
+    with transaction():
+        # FOR UPDATE also locks the index gaps of absent names until we commit
+        existing = {row["id"] for row in get_all_item_ids_by_names(names)}
+        # the unique index decides what counts as a repeat, under the column's collation, and
+        # the insert skips those rows; revision_count starts at one for the revisions below
+        fire([(*item, 1) for item in items])
+        # a created row holds the exact name of the first row to claim it
+        first = {}
+        for index, name in enumerate(names):
+            first.setdefault(name, index)
+        for row in get_all_item_ids_by_names(names):
+            if row["id"] not in existing:
+                ids[first[row["name"]]] = row["id"]
+        now = datetime.now(timezone.utc)
+        if revisions := [
+            (user_id, now, item_id, *item, False)
+            for item_id, item in zip(ids, items, strict=True)
+            if item_id
+        ]:
+            create_many_item_revisions(revisions)
+    return ids
+
+
+@query
+def create_many_item_revisions(fire, rows):
+    fire(rows)
+    update_item_list_change_marker()
+
+
 @query
 def create_item_revision(
     fire, user_id, item_id, name, description, quantity, unit, is_deleted=False
 ):
     now = datetime.now(timezone.utc)
-    return fire(user_id, now, item_id, name, description, quantity, unit, is_deleted)["lastrowid"]
+    revision_id = fire(user_id, now, item_id, name, description, quantity, unit, is_deleted)[
+        "lastrowid"
+    ]
+    # callers hold a transaction, so the counter moves together with the revision row
+    update_item_revision_count_by_id(item_id)
+    update_item_list_change_marker()
+    return revision_id
+
+
+@query
+def update_item_revision_count_by_id(fire, item_id):
+    fire(item_id)
+
+
+@query
+def get_all_item_tag_ids_by_names(fire, names):
+    # maps each name to the tag equal to it under the name column's collation, which may
+    # be stored with a different case or accents
+    return {names[row["position"] - 1]: row["id"] for row in fire(json.dumps(names))}
+
+
+@query
+def create_many_item_tags(fire, names):
+    # IGNORE lets a tag created concurrently since our lookup win instead of failing the batch
+    fire([(name,) for name in names])
+
+
+def resolve_item_tag_ids(names):
+    # one lookup for the whole batch, plus one more for the tags it had to create
+    names = list(dict.fromkeys(names))
+    if not names:
+        return {}
+    tag_ids = get_all_item_tag_ids_by_names(names)
+    if missing := [name for name in names if name not in tag_ids]:
+        create_many_item_tags(missing)
+        tag_ids |= get_all_item_tag_ids_by_names(missing)
+    return tag_ids
+
+
+@query
+def update_item_list_change_marker(fire):
+    # the list validator, bumped by every write to the list; revision ids are handed out at
+    # insert and can commit out of order, the marker only moves when its writer commits.
+    # callers hold a transaction, the marker row is locked until it commits
+    fire()
+
+
+@query
+def create_many_item_tag_associations(fire, associations):
+    with transaction():
+        fire(associations)
+        create_item_tag_revisions(associations)
+        update_item_list_change_marker()
+
+
+@query
+def create_item_tag_revisions(fire, associations, is_deleted=False):
+    # associations are (item_id, tag_id) pairs, recorded while they still exist so the tag's
+    # name can be copied; callers hold a transaction
+    fire(datetime.now(timezone.utc), is_deleted, tuple(map(tuple, associations)))
+
+
+@query
+def create_item_tag_revisions_by_tag_id(fire, tag_id):
+    # removals for every item carrying the tag, before deleting it cascades to them
+    fire(datetime.now(timezone.utc), tag_id)
+
+
+@query
+def create_many_item_comments(fire, comments):
+    fire(comments)
+
+
+@query
+def create_item_comment_revisions_by_item_ids(fire, user_id, item_ids):
+    # comments have no natural key to find the inserted ids by, but every comment on an item
+    # created in this transaction is one of ours
+    fire(user_id, datetime.now(timezone.utc), tuple(item_ids))
+    update_item_list_change_marker()
+
+
+@retrying
+def import_items(user_id, rows):
+    # rows are ItemImportRow models, the result lines up with them like create_many_items
+    with transaction():
+        ids = create_many_items(
+            user_id, [(row.name, row.description, row.quantity, row.unit) for row in rows]
+        )
+        created = [(item_id, row) for item_id, row in zip(ids, rows, strict=True) if item_id]
+
+        tag_ids = resolve_item_tag_ids(tag for _, row in created for tag in row.tags)
+        if associations := {
+            (item_id, tag_ids[tag]) for item_id, row in created for tag in row.tags
+        }:
+            create_many_item_tag_associations(sorted(associations))
+
+        # revision_count starts at one for the revisions written below
+        if comments := [
+            (user_id, item_id, text, 1) for item_id, row in created for text in row.comments
+        ]:
+            create_many_item_comments(comments)
+            create_item_comment_revisions_by_item_ids(
+                user_id, {item_id for _, item_id, _, _ in comments}
+            )
+    return ids
 
 
 @query
@@ -81,6 +302,15 @@ def get_item_by_id(fire, item_id):
     return Item(*result.values())
 
 
+@query
+def get_locked_item_by_id(fire, item_id):
+    # only meaningful inside a transaction, the lock is released on commit
+    result = fire(item_id)
+    if not result:
+        raise NotFoundError
+    return Item(*result.values())
+
+
 def make_joined_item(item_id, rows):
     tags = {}
     comments = {}
@@ -99,6 +329,7 @@ def make_joined_item(item_id, rows):
                 item_id,
                 row["comment_text"],
                 bool(row["item_comment_has_revisions"]),
+                row["comment_version"],
             )
     result = ItemFull(
         item_id,
@@ -113,17 +344,103 @@ def make_joined_item(item_id, rows):
     return result
 
 
-@query
-def get_all_joined_items(fire):
-    # TODO discuss compromises, cartesian product
-    grouped = groupby(fire(), lambda row: row["id"])
+def assemble_joined_items(item_rows, tag_rows, comment_rows):
+    items = {}
+    for row in item_rows:
+        items[row["id"]] = ItemFull(
+            row["id"],
+            row["name"],
+            row["description"],
+            row["quantity"],
+            row["unit"],
+            [],
+            [],
+            bool(row["item_has_revisions"]),
+        )
+    for row in tag_rows:
+        if item := items.get(row["item_id"]):
+            item.tags.append(ItemTag(row["tag_id"], row["tag_name"]))
+    for row in comment_rows:
+        if item := items.get(row["item_id"]):
+            item.comments.append(
+                ItemCommentFull(
+                    row["comment_id"],
+                    row["comment_user_id"],
+                    row["item_id"],
+                    row["comment_text"],
+                    bool(row["item_comment_has_revisions"]),
+                    row["comment_version"],
+                )
+            )
+    return list(items.values())
+
+
+def assemble_split_joined_items(item_rows):
+    if not item_rows:
+        return []
+    # item rows are ordered by id, so the relations only need to cover this id range
+    id_range = (item_rows[0]["id"], item_rows[-1]["id"])
+    return assemble_joined_items(
+        item_rows,
+        get_all_item_tag_associations(*id_range),
+        get_all_joinable_item_comments(*id_range),
+    )
+
+
+def make_joined_items(rows):
+    grouped = groupby(rows, lambda row: row["id"])
 
     items = []
-    for item_id, rows in grouped:
-        items.append(make_joined_item(item_id, rows))
+    for item_id, item_rows in grouped:
+        items.append(make_joined_item(item_id, item_rows))
     return items
 
 
+@query
+def get_all_joinable_items(fire):
+    return fire()
+
+
+@query
+def get_all_joinable_items_page(fire, after, limit):
+    return fire(after, limit)
+
+
+@query
+def get_all_item_tag_associations(fire, first_item_id, last_item_id):
+    return fire(first_item_id, last_item_id)
+
+
+@query
+def get_all_joinable_item_comments(fire, first_item_id, last_item_id):
+    return fire(first_item_id, last_item_id)
+
+
+@query
+def get_all_joined_items(fire):
+    if current_app.config["JOINED_ITEM_ASSEMBLY"] == AssemblyMode.SPLIT:
+        # a single snapshot keeps the three result sets consistent with each other
+        with transaction():
+            return assemble_split_joined_items(get_all_joinable_items())
+    return make_joined_items(fire())
+
+
+@query
+def get_all_joined_items_page(fire, after=0, limit=DEFAULT_PAGE_SIZE):
+    # one extra item tells us whether another page follows
+    if current_app.config["JOINED_ITEM_ASSEMBLY"] == AssemblyMode.SPLIT:
+        with transaction():
+            item_rows = get_all_joinable_items_page(after, limit + 1)
+            items = assemble_split_joined_items(item_rows[:limit])
+        has_more = len(item_rows) > limit
+    else:
+        items = make_joined_items(fire(after, limit + 1))
+        has_more = len(items) > limit
+        items = items[:limit]
+    next_cursor = items[-1].id if has_more else None
+    return Page(items, next_cursor)
+
+
 @query
 def get_joined_item_by_id(fire, item_id):
     rows = fire(item_id)
@@ -133,6 +450,68 @@ def get_joined_item_by_id(fire, item_id):
     return result
 
 
+@query
+def stream_all_joined_items(fire):
+    # groupby pulls one item's rows at a time off the unbuffered cursor
+    for item_id, rows in groupby(fire(), lambda row: row["id"]):
+        yield make_joined_item(item_id, rows)
+
+
+def _export_lines(items, export_format):
+    if export_format == ExportFormat.NDJSON:
+        for item in items:
+            yield current_app.json.dumps(asdict(item)) + "\n"
+        return
+
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(EXPORT_CSV_FIELDS)
+    for item in items:
+        writer.writerow(
+            (
+                item.id,
+                item.name,
+                item.description,
+                item.quantity,
+                item.unit,
+                current_app.json.dumps([tag.name for tag in item.tags]),
+                current_app.json.dumps([asdict(comment) for comment in item.comments]),
+            )
+        )
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+
+
+def export_items(export_format, chunk_size=EXPORT_CHUNK_SIZE):
+    # holds at most one item and one chunk, whatever the size of the inventory
+    chunk = []
+    size = 0
+    for line in _export_lines(stream_all_joined_items(), export_format):
+        chunk.append(line)
+        size += len(line)
+        if size >= chunk_size:
+            yield "".join(chunk)
+            chunk.clear()
+            size = 0
+    if chunk:
+        yield "".join(chunk)
+
+
+@query
+def get_item_collection_validator(fire):
+    # moves whenever anything shown by the joined item list changes
+    return "-".join(str(value) for value in fire().values())
+
+
+@query
+def get_item_validator(fire, item_id):
+    result = fire(item_id)
+    if not result:
+        raise NotFoundError
+    return "-".join(str(value) for value in result.values())
+
+
 @query
 def get_all_items(fire):
     results = fire()
@@ -148,27 +527,187 @@ def get_all_item_revisions_by_origin_id(fire, item_id):
 
 
 @query
-def update_item_by_id(fire, user_id, item_id, name, description, quantity, unit):
+def get_all_item_revisions_page(
+    fire, item_id, after=0, limit=DEFAULT_PAGE_SIZE, *, since=None, until=None
+):
+    # without a time range the foreign key index on id, which InnoDB extends with _id, serves
+    # the seek and the order; with one, item_revision_id_datetime narrows the rows instead
+    results = fire(item_id, after, since, since, until, until, limit + 1)
+    revisions = [ItemRevision(**result) for result in results[:limit]]
+    if not revisions:
+        # an empty page is fine, a missing item is not
+        get_item_by_id(item_id)
+    next_cursor = revisions[-1]._id if len(results) > limit else None
+    return Page(revisions, next_cursor)
+
+
+@query
+def get_item_change_watermark(fire, settled_before):
+    result = fire(settled_before, settled_before, settled_before)
+    return (
+        result["item_revision_id"],
+        result["item_comment_revision_id"],
+        result["item_tag_revision_id"],
+    )
+
+
+@query
+def get_all_item_changes(fire, after_revision_id, until_revision_id):
+    results = fire(after_revision_id, until_revision_id)
+    return [ItemRevision(**result) for result in results]
+
+
+@query
+def get_all_item_comment_changes(fire, after_revision_id, until_revision_id):
+    results = fire(after_revision_id, until_revision_id)
+    return [ItemCommentChange(**result) for result in results]
+
+
+@query
+def get_all_item_tag_changes(fire, after_revision_id, until_revision_id):
+    results = fire(after_revision_id, until_revision_id)
+    return [ItemTagChange(**result) for result in results]
+
+
+def get_item_changes(item_revision_id, item_comment_revision_id, item_tag_revision_id=0):
+    # revision ids are handed out before commit, so a fresh watermark could skip over a
+    # transaction that commits a lower id later; only revisions past the settle window count
+    settle = timedelta(seconds=current_app.config["CHANGES_SETTLE_SECONDS"])
+    settled_before = datetime.now(timezone.utc) - settle
+    with transaction():
+        item_watermark, item_comment_watermark, item_tag_watermark = get_item_change_watermark(
+            settled_before
+        )
+        item_watermark = max(item_watermark, item_revision_id)
+        item_comment_watermark = max(item_comment_watermark, item_comment_revision_id)
+        item_tag_watermark = max(item_tag_watermark, item_tag_revision_id)
+        items = get_all_item_changes(item_revision_id, item_watermark)
+        comments = get_all_item_comment_changes(item_comment_revision_id, item_comment_watermark)
+        tags = get_all_item_tag_changes(item_tag_revision_id, item_tag_watermark)
+    return ItemChanges(
+        items, comments, tags, f"{item_watermark}.{item_comment_watermark}.{item_tag_watermark}"
+    )
+
+
+@query
+def get_latest_item_snapshot(fire, taken_before):
+    result = fire(taken_before)
+    return ItemSnapshot(**result) if result else None
+
+
+@retrying
+@query
+def create_item_snapshot(fire):
+    # like the change feed, only settled revisions are certain not to be followed by a
+    # lower _datetime committing later
+    settle = timedelta(seconds=current_app.config["CHANGES_SETTLE_SECONDS"])
+    taken_at = (datetime.now(timezone.utc) - settle).replace(tzinfo=None, microsecond=0)
     with transaction():
-        result = fire(name, description, quantity, unit, item_id)
+        # built from the previous checkpoint plus the revisions since, not the whole history
+        previous = get_latest_item_snapshot(taken_at) or ItemSnapshot(None, None)
+        snapshot_id = fire(taken_at)["lastrowid"]
+        create_item_snapshot_rows(snapshot_id, previous.taken_at, taken_at, previous.id)
+    return ItemSnapshot(snapshot_id, taken_at)
+
+
+@query
+def create_item_snapshot_rows(fire, snapshot_id, after, until, previous_snapshot_id):
+    # live and archived revisions alike, archiving must not change what a checkpoint holds
+    fire(snapshot_id, after, after, until, after, after, until, previous_snapshot_id)
+
+
+@query
+def get_all_items_as_of_page(fire, as_of, after=0, limit=DEFAULT_PAGE_SIZE):
+    # the latest revision of each item at or before as_of, live or archived, replayed over
+    # the closest checkpoint, with items deleted by then left out
+    with transaction():
+        snapshot = get_latest_item_snapshot(as_of) or ItemSnapshot(None, None)
+        revision_range = (snapshot.taken_at, snapshot.taken_at, as_of, after)
+        results = fire(*revision_range, *revision_range, snapshot.id, after, limit + 1)
+    items = [Item(**result) for result in results[:limit]]
+    next_cursor = items[-1].id if len(results) > limit else None
+    return Page(items, next_cursor)
+
+
+@retrying
+@query
+def update_item_by_id(fire, user_id, item_id, name, description, quantity, unit, *, version=None):
+    # revision_count is the row version, a conditional write replaces only the version the
+    # client read and holds no lock beyond the statement's own; returns the new validator,
+    # read while the row lock still keeps other writers out
+    with transaction():
+        result = fire(name, description, quantity, unit, item_id, version, version)
         if not result["rowcount"]:
-            raise NotFoundError
+            # missing, outdated, or already holding these values
+            current = get_locked_item_version_by_id(item_id)
+            if version is not None and version != current:
+                raise VersionMismatchError
         create_item_revision(user_id, item_id, name, description, quantity, unit, False)
+        return get_item_validator(item_id)
+
+
+@query
+def get_locked_item_version_by_id(fire, item_id):
+    # a locking read, a plain one could answer from an older snapshot
+    result = fire(item_id)
+    if not result:
+        raise NotFoundError
+    return result["revision_count"]
+
+
+@retrying
+@query
+def update_item_quantity_by_id(fire, user_id, item_id, delta):
+    with transaction():
+        # the guarded increment takes the row lock itself, so concurrent adjusters queue on
+        # it instead of racing a read-modify-write; the lock is held only until commit
+        result = fire(delta, item_id, delta, MAX_QUANTITY)
+        if not result["rowcount"]:
+            # raises NotFoundError for a missing or deleted item, otherwise the guard
+            # rejected the delta for taking the quantity out of the column's range
+            get_item_validator(item_id)
+            raise InsufficientQuantityError
+        item = get_item_by_id(item_id)
+        create_item_revision(
+            user_id, item_id, item.name, item.description, item.quantity, item.unit, False
+        )
+        return item
 
 
+@retrying
 @query
 def delete_item_by_id(fire, item_id):
     # danger
-    fire(item_id)
+    with transaction():
+        # the live revisions cascade away with the item, so a deleting revision is copied to
+        # the archive first, ending the item in "as of" reads and checkpoints after this
+        original = get_locked_item_by_id(item_id)
+        revision_id = create_item_revision(
+            None,
+            item_id,
+            original.name,
+            original.description,
+            original.quantity,
+            original.unit,
+            is_deleted=True,
+        )
+        create_item_revision_tombstone(revision_id)
+        fire(item_id)
+        update_item_list_change_marker()
+
+
+@query
+def create_item_revision_tombstone(fire, revision_id):
+    fire(revision_id)
 
 
+@retrying
 @query
 def update_item_deletion_flag_by_id(fire, user_id, item_id):
-    with (
-        transaction(),
-        locked_tables(("item", LockType.WRITE), ("item_revision", LockType.WRITE)),
-    ):
-        original = get_item_by_id(item_id)
+    with transaction():
+        # the row lock keeps the copied values current until the revision is written,
+        # without holding up writers of any other item
+        original = get_locked_item_by_id(item_id)
         fire(item_id)
         create_item_revision(
             user_id,
@@ -181,6 +720,7 @@ def update_item_deletion_flag_by_id(fire, user_id, item_id):
         )
 
 
+@retrying
 @query
 def create_item_comment(fire, user_id, item_id, text):
     with transaction():
@@ -197,13 +737,19 @@ def get_item_comment_by_id(fire, item_comment_id):
     return ItemComment(**result)
 
 
+@query
+def get_locked_item_comment_by_id(fire, item_comment_id):
+    result = fire(item_comment_id)
+    if not result:
+        raise NotFoundError
+    return ItemComment(**result)
+
+
+@retrying
 @query
 def update_item_comment_deletion_flag_by_id(fire, user_id, item_comment_id):
-    with (
-        transaction(),
-        locked_tables(("item_comment", LockType.WRITE), ("item_comment_revision", LockType.WRITE)),
-    ):
-        original = get_item_comment_by_id(item_comment_id)
+    with transaction():
+        original = get_locked_item_comment_by_id(item_comment_id)
         fire(item_comment_id)
         create_item_comment_revision(
             user_id,
@@ -222,7 +768,15 @@ def update_item_comment_deletion_flag_by_id(fire, user_id, item_comment_id):
 @query
 def create_item_comment_revision(fire, editing_user_id, item_comment_id, text, is_deleted=False):
     now = datetime.now(timezone.utc)
-    return fire(editing_user_id, now, item_comment_id, text, is_deleted)["lastrowid"]
+    revision_id = fire(editing_user_id, now, item_comment_id, text, is_deleted)["lastrowid"]
+    update_item_comment_revision_count_by_id(item_comment_id)
+    update_item_list_change_marker()
+    return revision_id
+
+
+@query
+def update_item_comment_revision_count_by_id(fire, item_comment_id):
+    fire(item_comment_id)
 
 
 @query
@@ -232,15 +786,46 @@ def get_all_item_comment_revisions_by_origin_id(fire, item_comment_id):
 
 
 @query
-def update_item_comment_by_id(fire, user_id, item_comment_id, text):
+def get_all_item_comment_revisions_page(
+    fire, item_comment_id, after=0, limit=DEFAULT_PAGE_SIZE, *, since=None, until=None
+):
+    # indexed like get_all_item_revisions_page
+    results = fire(item_comment_id, after, since, since, until, until, limit + 1)
+    revisions = [ItemCommentRevision(**result) for result in results[:limit]]
+    if not revisions:
+        get_item_comment_by_id(item_comment_id)
+    next_cursor = revisions[-1]._id if len(results) > limit else None
+    return Page(revisions, next_cursor)
+
+
+@retrying
+@query
+def update_item_comment_by_id(fire, user_id, item_comment_id, text, *, version=None):
+    # conditional like update_item_by_id, returns the new version
     with transaction():
-        fire(text, item_comment_id)
+        result = fire(text, item_comment_id, version, version)
+        current = get_locked_item_comment_version_by_id(item_comment_id)
+        if not result["rowcount"] and version is not None and version != current:
+            raise VersionMismatchError
         create_item_comment_revision(user_id, item_comment_id, text, False)
+        return current + 1
+
+
+@query
+def get_locked_item_comment_version_by_id(fire, item_comment_id):
+    result = fire(item_comment_id)
+    if not result:
+        raise NotFoundError
+    return result["revision_count"]
 
 
+@retrying
 @query
 def delete_item_comment_by_id(fire, item_comment_id):
-    fire(item_comment_id)
+    # danger
+    with transaction():
+        fire(item_comment_id)
+        update_item_list_change_marker()
 
 
 @query
@@ -248,9 +833,13 @@ def create_item_tag(fire, name):
     return fire(name)["lastrowid"]
 
 
+@retrying
 @query
 def create_item_tag_association(fire, item_id, tag_id):
-    fire(item_id, tag_id)
+    with transaction():
+        fire(item_id, tag_id)
+        create_item_tag_revisions([(item_id, tag_id)])
+        update_item_list_change_marker()
 
 
 @query
@@ -273,11 +862,124 @@ def get_all_item_tags(fire):
 #     return [ItemTag(*result.values()) for result in results]
 
 
+@retrying
 @query
 def delete_item_tag_by_id(fire, tag_id):
-    fire(tag_id)
+    # cascades to the tag's associations
+    with transaction():
+        create_item_tag_revisions_by_tag_id(tag_id)
+        fire(tag_id)
+        update_item_list_change_marker()
 
 
+@retrying
 @query
 def delete_item_tag_association(fire, item_id, tag_id):
-    fire(item_id, tag_id)
+    with transaction():
+        create_item_tag_revisions([(item_id, tag_id)], is_deleted=True)
+        fire(item_id, tag_id)
+        update_item_list_change_marker()
+
+
+@query
+def update_all_item_revision_counts(fire):
+    fire()
+
+
+@query
+def update_all_item_comment_revision_counts(fire):
+    fire()
+
+
+@item_cli.command("backfill-revision-counts")
+def backfill_revision_counts_command():
+    update_all_item_revision_counts()
+    update_all_item_comment_revision_counts()
+    click.echo("Done.")
+
+
+@item_cli.command("snapshot")
+def snapshot_command():
+    snapshot = create_item_snapshot()
+    click.echo(f"Snapshot {snapshot.id} taken at {snapshot.taken_at.isoformat()} UTC.")
+
+
+@item_cli.command("export")
+@click.option(
+    "--format",
+    "export_format",
+    type=click.Choice([export_format.value for export_format in ExportFormat]),
+    default=ExportFormat.NDJSON.value,
+    show_default=True,
+)
+@click.option("--output", type=click.File("w", encoding="utf-8"), default="-")
+def export_command(export_format, output):
+    for chunk in export_items(ExportFormat(export_format)):
+        output.write(chunk)
+
+
+def _read_import_records(fileobj, import_format):
+    # NDJSON lines are left as text so malformed ones fail validation like any other record
+    if import_format == ExportFormat.NDJSON:
+        yield from (line for line in fileobj if line.strip())
+        return
+
+    for record in csv.DictReader(fileobj):
+        # empty cells stand for missing values
+        yield {key: value for key, value in record.items() if value}
+
+
+def _batched(iterable, size):
+    iterator = iter(iterable)
+    while batch := list(islice(iterator, size)):
+        yield batch
+
+
+@item_cli.command("import")
+@click.argument("file", type=click.File("r", encoding="utf-8"))
+@click.option("--user", "username", required=True, help="Author of the imported revisions.")
+@click.option(
+    "--format",
+    "import_format",
+    type=click.Choice([import_format.value for import_format in ExportFormat]),
+    help="Defaults to the file extension, ndjson unless it is .csv.",
+)
+@click.option(
+    "--batch-size", type=click.IntRange(min=1), default=IMPORT_BATCH_SIZE, show_default=True
+)
+def import_command(file, username, import_format, batch_size):
+    if (user := get_user_by_name(username)) is None:
+        raise click.BadParameter(f"No user named {username}", param_hint="--user")
+    if import_format is None:
+        csv_file = Path(file.name).suffix.lower() == ".csv"
+        import_format = ExportFormat.CSV if csv_file else ExportFormat.NDJSON
+
+    processed = imported = 0
+    for batch in _batched(enumerate(_read_import_records(file, import_format), 1), batch_size):
+        rows = []
+        for number, record in batch:
+            try:
+                if isinstance(record, str):
+                    rows.append(ItemImportRow.model_validate_json(record))
+                else:
+                    rows.append(ItemImportRow.model_validate(record))
+            except ValidationError as err:
+                click.echo(f"Record {number} skipped: {err.errors(include_url=False)}", err=True)
+        # each batch commits on its own, a failure leaves the earlier batches imported
+        ids = import_items(user.id, rows)
+        for row, item_id in zip(rows, ids, strict=True):
+            if item_id is None:
+                click.echo(f"Item {row.name} skipped: name already exists", err=True)
+        processed += len(batch)
+        imported += sum(item_id is not None for item_id in ids)
+        click.echo(f"{processed} records processed, {imported} items imported", err=True)
+    click.echo("Done.")
+
+
+def setup_app(app):
+    app.config.setdefault("JOINED_ITEM_ASSEMBLY", AssemblyMode.SPLIT)
+    # has to outlast the longest write transaction, from stamping a revision to committing
+    # it, or the change feed and snapshots can pass over a revision for good; lock waits
+    # are capped by DATABASE_LOCK_WAIT_TIMEOUT, bulk creates and import batches stay small
+    app.config.setdefault("CHANGES_SETTLE_SECONDS", 60)
+    app.cli.add_command(item_cli)
@@ -0,0 +1 @@
+INSERT INTO item_comment_revision (_user_id, _datetime, id, text, is_deleted) SELECT %s, %s, id, text, False FROM item_comment WHERE item_id IN %s;
@@ -0,0 +1,4 @@
+INSERT INTO item_revision_archive
+(_id, _user_id, _datetime, id, name, description, quantity, unit, is_deleted)
+SELECT _id, _user_id, _datetime, id, name, description, quantity, unit, is_deleted
+FROM item_revision WHERE _id = %s;
@@ -0,0 +1 @@
+INSERT INTO item_snapshot (taken_at) VALUES (%s);
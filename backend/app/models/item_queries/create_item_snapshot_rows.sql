@@ -0,0 +1,18 @@
+INSERT INTO item_snapshot_row (snapshot_id, id, name, description, quantity, unit)
+SELECT %s, id, name, description, quantity, unit FROM (
+    SELECT candidate.*, ROW_NUMBER() OVER (PARTITION BY id ORDER BY source, _id DESC) AS position
+    FROM (
+        SELECT 0 AS source, _id, id, name, description, quantity, unit, is_deleted
+        FROM item_revision
+        WHERE (%s IS NULL OR _datetime > %s) AND _datetime <= %s
+        UNION ALL
+        SELECT 0, _id, id, name, description, quantity, unit, is_deleted
+        FROM item_revision_archive
+        WHERE (%s IS NULL OR _datetime > %s) AND _datetime <= %s
+        UNION ALL
+        SELECT 1, 0, id, name, description, quantity, unit, False
+        FROM item_snapshot_row
+        WHERE snapshot_id = %s
+    ) AS candidate
+) AS ranked
+WHERE position = 1 AND is_deleted = False;
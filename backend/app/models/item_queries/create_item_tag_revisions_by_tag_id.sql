@@ -0,0 +1,5 @@
+INSERT INTO item_tag_revision (_datetime, item_id, item_tag_id, name, is_deleted)
+SELECT %s, item_tag_junction.item_id, item_tag.id, item_tag.name, True
+FROM item_tag_junction
+JOIN item_tag ON item_tag.id = item_tag_junction.item_tag_id
+WHERE item_tag_junction.item_tag_id = %s;
@@ -0,0 +1 @@
+INSERT INTO item_comment (user_id, item_id, text, revision_count) VALUES (%s, %s, %s, %s);
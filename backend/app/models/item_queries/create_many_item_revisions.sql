@@ -0,0 +1 @@
+INSERT INTO item_revision (_user_id, _datetime, id, name, description, quantity, unit, is_deleted) VALUES (%s, %s, %s, %s, %s, %s, %s, %s);
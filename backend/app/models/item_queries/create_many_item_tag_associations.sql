@@ -0,0 +1 @@
+INSERT INTO item_tag_junction (item_id, item_tag_id) VALUES (%s, %s);
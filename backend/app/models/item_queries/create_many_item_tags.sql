@@ -0,0 +1 @@
+INSERT IGNORE INTO item_tag (name) VALUES (%s);
@@ -0,0 +1,2 @@
+INSERT INTO item (name, description, quantity, unit, revision_count) VALUES (%s, %s, %s, %s, %s)
+ON DUPLICATE KEY UPDATE id = id;
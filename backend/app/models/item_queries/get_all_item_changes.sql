@@ -0,0 +1,11 @@
+SELECT
+item_revision._id, item_revision._user_id, item_revision._datetime, item_revision.id,
+item_revision.name, item_revision.description, item_revision.quantity, item_revision.unit,
+item_revision.is_deleted
+FROM item_revision
+JOIN (
+	SELECT MAX(_id) AS _id FROM item_revision
+	WHERE _id > %s AND _id <= %s
+	GROUP BY id
+) AS latest ON latest._id = item_revision._id
+ORDER BY item_revision.id;
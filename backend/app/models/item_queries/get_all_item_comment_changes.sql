@@ -0,0 +1,12 @@
+SELECT
+item_comment_revision._id, item_comment_revision._user_id, item_comment_revision._datetime,
+item_comment_revision.id, item_comment_revision.text, item_comment_revision.is_deleted,
+item_comment.item_id
+FROM item_comment_revision
+JOIN (
+	SELECT MAX(_id) AS _id FROM item_comment_revision
+	WHERE _id > %s AND _id <= %s
+	GROUP BY id
+) AS latest ON latest._id = item_comment_revision._id
+JOIN item_comment ON item_comment.id = item_comment_revision.id
+ORDER BY item_comment_revision.id;
@@ -0,0 +1 @@
+SELECT id, name FROM item WHERE name IN %s FOR UPDATE;
@@ -0,0 +1,5 @@
+SELECT _id, _user_id, _datetime, id, name, description, quantity, unit, is_deleted FROM item_revision
+WHERE id = %s AND _id > %s
+AND (%s IS NULL OR _datetime >= %s) AND (%s IS NULL OR _datetime < %s)
+ORDER BY _id
+LIMIT %s;
@@ -0,0 +1,6 @@
+SELECT item_tag_junction.item_id, item_tag.id AS tag_id, item_tag.name AS tag_name
+FROM item_tag_junction
+JOIN item_tag ON item_tag.id = item_tag_junction.item_tag_id
+JOIN item ON item.id = item_tag_junction.item_id
+WHERE item.is_deleted = False AND item_tag_junction.item_id BETWEEN %s AND %s
+ORDER BY item_tag_junction.item_id, item_tag.id;
@@ -0,0 +1,10 @@
+SELECT
+item_tag_revision._id, item_tag_revision._datetime, item_tag_revision.item_id,
+item_tag_revision.item_tag_id, item_tag_revision.name, item_tag_revision.is_deleted
+FROM item_tag_revision
+JOIN (
+	SELECT MAX(_id) AS _id FROM item_tag_revision
+	WHERE _id > %s AND _id <= %s
+	GROUP BY item_id, item_tag_id
+) AS latest ON latest._id = item_tag_revision._id
+ORDER BY item_tag_revision.item_id, item_tag_revision.item_tag_id;
@@ -0,0 +1,5 @@
+SELECT input.position, item_tag.id
+FROM JSON_TABLE(
+    %s, '$[*]' COLUMNS (position FOR ORDINALITY, name VARCHAR(100) PATH '$')
+) AS input
+JOIN item_tag ON item_tag.name = input.name;
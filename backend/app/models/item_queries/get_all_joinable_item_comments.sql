@@ -0,0 +1,9 @@
+SELECT
+item_comment.item_id, item_comment.id AS comment_id, item_comment.user_id AS comment_user_id,
+item_comment.text AS comment_text,
+item_comment.revision_count > 1 AS item_comment_has_revisions, item_comment.revision_count AS comment_version
+FROM item_comment
+JOIN item ON item.id = item_comment.item_id
+WHERE item.is_deleted = False AND item_comment.is_deleted = False
+AND item_comment.item_id BETWEEN %s AND %s
+ORDER BY item_comment.item_id, item_comment.id;
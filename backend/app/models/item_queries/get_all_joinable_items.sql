@@ -0,0 +1,6 @@
+SELECT
+item.id, item.name, item.description, item.quantity, item.unit,
+item.revision_count > 1 AS item_has_revisions
+FROM item
+WHERE item.is_deleted = False
+ORDER BY item.id;
@@ -0,0 +1,10 @@
+SELECT
+COALESCE((
+	SELECT _id FROM item_revision WHERE _datetime <= %s ORDER BY _id DESC LIMIT 1
+), 0) AS item_revision_id,
+COALESCE((
+	SELECT _id FROM item_comment_revision WHERE _datetime <= %s ORDER BY _id DESC LIMIT 1
+), 0) AS item_comment_revision_id,
+COALESCE((
+	SELECT _id FROM item_tag_revision WHERE _datetime <= %s ORDER BY _id DESC LIMIT 1
+), 0) AS item_tag_revision_id;
@@ -0,0 +1,2 @@
+SELECT COALESCE(SUM(value), 0) AS change_marker
+FROM change_marker WHERE name IN ('item_list', 'users');
@@ -0,0 +1,17 @@
+SELECT
+item.revision_count,
+(
+	SELECT COALESCE(SUM(item_comment.revision_count), 0) FROM item_comment
+	WHERE item_comment.item_id = item.id
+) AS comment_revision_count,
+(
+	SELECT COUNT(*) FROM item_tag_junction WHERE item_tag_junction.item_id = item.id
+) AS tag_count,
+(
+	SELECT COALESCE(BIT_XOR(CRC32(item_tag_id)), 0) FROM item_tag_junction
+	WHERE item_tag_junction.item_id = item.id
+) AS tag_checksum,
+-- deleting a user nulls the user_id of their comments
+(SELECT COALESCE(MAX(value), 0) FROM change_marker WHERE name = 'users') AS users_marker
+FROM item
+WHERE item.id = %s AND item.is_deleted = False;
@@ -0,0 +1 @@
+SELECT id, taken_at FROM item_snapshot WHERE taken_at <= %s ORDER BY taken_at DESC, id DESC LIMIT 1;
@@ -0,0 +1 @@
+SELECT id, name, description, quantity, unit FROM item WHERE id = %s FOR UPDATE;
@@ -0,0 +1 @@
+SELECT id, user_id, item_id, text FROM item_comment WHERE id = %s FOR UPDATE;
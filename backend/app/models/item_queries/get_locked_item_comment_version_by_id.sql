@@ -0,0 +1 @@
+SELECT revision_count FROM item_comment WHERE id = %s FOR UPDATE;
@@ -0,0 +1 @@
+SELECT revision_count FROM item WHERE id = %s FOR UPDATE;
@@ -0,0 +1,12 @@
+SELECT
+item.id, item.name, item.description, item.quantity, item.unit,
+item.revision_count > 1 AS item_has_revisions,
+item_tag.id as tag_id, item_tag.name as tag_name,
+item_comment.id AS comment_id, item_comment.user_id AS comment_user_id, item_comment.text AS comment_text,
+item_comment.revision_count > 1 AS item_comment_has_revisions, item_comment.revision_count AS comment_version
+FROM item
+LEFT JOIN item_tag_junction ON item_tag_junction.item_id = item.id
+LEFT JOIN item_tag ON item_tag.id = item_tag_junction.item_tag_id
+LEFT JOIN item_comment ON item_comment.item_id = item.id AND item_comment.is_deleted = False
+WHERE item.is_deleted = False
+ORDER BY item.id, item_tag.id, item_comment.id;
@@ -0,0 +1,6 @@
+UPDATE item_comment SET revision_count = (
+	SELECT COUNT(*) FROM item_comment_revision WHERE item_comment_revision.id = item_comment.id
+) + (
+	SELECT COUNT(*) FROM item_comment_revision_archive
+	WHERE item_comment_revision_archive.id = item_comment.id
+);
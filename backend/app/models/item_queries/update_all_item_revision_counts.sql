@@ -0,0 +1,5 @@
+UPDATE item SET revision_count = (
+	SELECT COUNT(*) FROM item_revision WHERE item_revision.id = item.id
+) + (
+	SELECT COUNT(*) FROM item_revision_archive WHERE item_revision_archive.id = item.id
+);
@@ -1 +1 @@
-UPDATE item SET name = %s, description = %s, quantity = %s, unit = %s WHERE id = %s;
+UPDATE item SET name = %s, description = %s, quantity = %s, unit = %s WHERE id = %s AND (%s IS NULL OR revision_count = %s);
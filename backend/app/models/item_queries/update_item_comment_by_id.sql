@@ -1 +1 @@
-UPDATE item_comment SET text = %s WHERE id = %s;
+UPDATE item_comment SET text = %s WHERE id = %s AND (%s IS NULL OR revision_count = %s);
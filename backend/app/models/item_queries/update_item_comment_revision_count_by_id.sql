@@ -0,0 +1 @@
+UPDATE item_comment SET revision_count = revision_count + 1 WHERE id = %s;
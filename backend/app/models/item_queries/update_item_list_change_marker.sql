@@ -0,0 +1,2 @@
+INSERT INTO change_marker (name, value) VALUES ('item_list', 1)
+ON DUPLICATE KEY UPDATE value = value + 1;
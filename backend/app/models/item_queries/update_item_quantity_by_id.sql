@@ -0,0 +1,2 @@
+UPDATE item SET quantity = quantity + %s
+WHERE id = %s AND is_deleted = False AND quantity + %s BETWEEN 0 AND %s;
@@ -0,0 +1,9 @@
+ALTER TABLE item ADD COLUMN IF NOT EXISTS revision_count INTEGER NOT NULL DEFAULT 0;
+ALTER TABLE item_comment ADD COLUMN IF NOT EXISTS revision_count INTEGER NOT NULL DEFAULT 0;
+
+UPDATE item SET revision_count = (
+	SELECT COUNT(*) FROM item_revision WHERE item_revision.id = item.id
+);
+UPDATE item_comment SET revision_count = (
+	SELECT COUNT(*) FROM item_comment_revision WHERE item_comment_revision.id = item_comment.id
+);
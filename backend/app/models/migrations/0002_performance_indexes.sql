@@ -0,0 +1,6 @@
+-- listing filters on is_deleted and seeks on id, which InnoDB appends to every secondary index
+CREATE INDEX IF NOT EXISTS item_is_deleted ON item (is_deleted);
+CREATE INDEX IF NOT EXISTS item_comment_item_id_is_deleted ON item_comment (item_id, is_deleted);
+-- revision history lookups by origin id, ordered or ranged by time
+CREATE INDEX IF NOT EXISTS item_revision_id_datetime ON item_revision (id, _datetime);
+CREATE INDEX IF NOT EXISTS item_comment_revision_id_datetime ON item_comment_revision (id, _datetime);
@@ -0,0 +1,21 @@
+-- periodic checkpoints of every live item, so "as of" reads only replay the revisions
+-- written after the closest checkpoint instead of the whole history
+CREATE TABLE IF NOT EXISTS item_snapshot (
+    id INTEGER PRIMARY KEY AUTO_INCREMENT,
+    -- covers every revision with _datetime <= taken_at
+    taken_at DATETIME NOT NULL,
+    INDEX item_snapshot_taken_at (taken_at)
+);
+-- full copies rather than revision references, so they outlive archived revisions
+CREATE TABLE IF NOT EXISTS item_snapshot_row (
+    snapshot_id INTEGER NOT NULL,
+    id INTEGER NOT NULL,
+    name VARCHAR(256),
+    description VARCHAR(1024),
+    quantity INTEGER NOT NULL,
+    unit VARCHAR(100),
+    PRIMARY KEY (snapshot_id, id),
+    FOREIGN KEY (snapshot_id) REFERENCES item_snapshot(id) ON DELETE CASCADE
+);
+-- replaying the revisions between a checkpoint and the requested time
+CREATE INDEX IF NOT EXISTS item_revision_datetime ON item_revision (_datetime);
@@ -0,0 +1,27 @@
+-- revisions moved out by `flask revisions archive`, no foreign keys so the archive
+-- does not hold up or cascade with the live tables
+CREATE TABLE IF NOT EXISTS item_revision_archive (
+    _id INTEGER PRIMARY KEY,
+    _user_id INTEGER,
+    _datetime DATETIME,
+    id INTEGER NOT NULL,
+    name VARCHAR(256),
+    description VARCHAR(1024),
+    quantity INTEGER NOT NULL,
+    unit VARCHAR(100),
+    is_deleted BOOLEAN DEFAULT False,
+    INDEX item_revision_archive_id (id),
+    -- "as of" reads replay archived revisions too
+    INDEX item_revision_archive_datetime (_datetime)
+);
+CREATE TABLE IF NOT EXISTS item_comment_revision_archive (
+    _id INTEGER PRIMARY KEY,
+    _user_id INTEGER,
+    _datetime DATETIME,
+    id INTEGER NOT NULL,
+    text VARCHAR(2000) NOT NULL,
+    is_deleted BOOLEAN DEFAULT False,
+    INDEX item_comment_revision_archive_id (id)
+);
+-- finding the newest revision old enough to archive
+CREATE INDEX IF NOT EXISTS item_comment_revision_datetime ON item_comment_revision (_datetime);
@@ -0,0 +1,11 @@
+-- one row per tag added to or removed from an item, for the change feed; the tag's name is
+-- copied and not keyed, so a removal outlives the tag itself
+CREATE TABLE IF NOT EXISTS item_tag_revision (
+    _id INTEGER PRIMARY KEY AUTO_INCREMENT,
+    _datetime DATETIME,
+    item_id INTEGER NOT NULL,
+    item_tag_id INTEGER NOT NULL,
+    name VARCHAR(100) NOT NULL,
+    is_deleted BOOLEAN DEFAULT False,
+    FOREIGN KEY (item_id) REFERENCES item(id) ON DELETE CASCADE
+);
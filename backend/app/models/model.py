@@ -1,15 +1,63 @@
 import inspect
+import re
+import time
+from contextlib import contextmanager
 from dataclasses import dataclass
 from datetime import datetime
 from enum import auto, StrEnum
-from functools import partial, wraps
+from functools import cache, partial, wraps
 from pathlib import Path
 
-from flask import g
+import pymysql
+from flask import current_app, g
+
+from app.db import after_commit, get_db_connection, retrying
+from app.metrics import REGISTRY
+
+QUERY_DURATION = REGISTRY.histogram(
+    "db_query_duration_seconds", "Time spent executing each named query.", ("query",)
+)
+QUERY_ROWS = REGISTRY.counter(
+    "db_query_rows_total", "Rows returned or affected by each named query.", ("query",)
+)
+QUERY_ERRORS = REGISTRY.counter(
+    "db_query_errors_total", "Executions of each named query that raised.", ("query",)
+)
+SLOW_QUERIES = REGISTRY.counter(
+    "db_slow_queries_total", "Executions of each named query over the slow threshold.", ("query",)
+)
+
+SLOW_QUERY_DEFAULTS = {
+    # seconds, None disables the slow query log
+    "SLOW_QUERY_THRESHOLD": None,
+    "SLOW_QUERY_EXPLAIN": False,
+    # parameters can carry password hashes and other user data
+    "SLOW_QUERY_LOG_PARAMETERS": False,
+}
+
+EXPLAINABLE_STATEMENTS = ("SELECT", "UPDATE", "DELETE")
+
+WRITTEN_TABLE_PATTERN = re.compile(
+    r"^\s*(?:INSERT\s+(?:IGNORE\s+)?INTO|UPDATE|DELETE\s+FROM)\s+`?(\w+)`?", re.IGNORECASE
+)
+
+VALID_PREFIXES = (
+    "get_all",
+    "get_joined",
+    "get",
+    "stream",
+    "create_many",
+    "create",
+    "update",
+    "delete",
+)
 
-from app.db import get_db_connection
 
-VALID_PREFIXES = ("get_all", "get_joined", "get", "create", "update", "delete")
+@dataclass
+class Page:
+    items: list
+    # pass back as the "after" cursor to fetch the following page, None on the last page
+    next_cursor: int | None
 
 
 @dataclass
@@ -30,8 +78,14 @@ def query(func):
         call_func = _call_fetchall
     elif name.startswith("get"):
         call_func = _call_fetchone
+    elif name.startswith("stream"):
+        call_func = _call_stream
+    elif name.startswith("create_many"):
+        # a statement run on its own is retried alone, inside a transaction the retry is
+        # left to whoever opened it
+        call_func = retrying(_call_commit_many)
     elif name.startswith("create") or name.startswith("update") or name.startswith("delete"):
-        call_func = _call_commit
+        call_func = retrying(_call_commit)
     else:
         raise ValueError(
             f"Function name {name} is invalid, must start with {','.join(VALID_PREFIXES)}"
@@ -44,32 +98,148 @@ def query(func):
 
     @wraps(func)
     def inner(*args, **kwargs):
-        return func(partial(call_func, query_str), *args, **kwargs)
+        return func(partial(call_func, query_str, query_name=name), *args, **kwargs)
 
     return inner
 
 
-def _call_commit(query, *args):
+@dataclass
+class Measurement:
+    rows: int = 0
+    duration: float = 0.0
+    failed: bool = False
+
+
+@contextmanager
+def _measure(query_name, conn, query, args):
+    measurement = Measurement()
+    start = time.perf_counter()
+    try:
+        yield measurement
+    except Exception:
+        measurement.failed = True
+        QUERY_ERRORS.inc(query=query_name)
+        raise
+    finally:
+        measurement.duration = time.perf_counter() - start
+        QUERY_DURATION.observe(measurement.duration, query=query_name)
+        QUERY_ROWS.inc(measurement.rows, query=query_name)
+        threshold = current_app.config["SLOW_QUERY_THRESHOLD"]
+        if threshold is not None and measurement.duration >= threshold:
+            _log_slow_query(query_name, conn, query, args, measurement)
+
+
+def _explain(conn, query, args):
+    statement = query.strip()
+    if not statement.upper().startswith(EXPLAINABLE_STATEMENTS) or ";" in statement.rstrip(";"):
+        return None
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute(f"EXPLAIN {statement}", args)
+            return cursor.fetchall()
+    except pymysql.Error as err:
+        return f"EXPLAIN failed: {err}"
+
+
+def _log_slow_query(query_name, conn, query, args, measurement):
+    SLOW_QUERIES.inc(query=query_name)
+    config = current_app.config
+    parameters = args if config["SLOW_QUERY_LOG_PARAMETERS"] else "<redacted>"
+    plan = None
+    if config["SLOW_QUERY_EXPLAIN"] and not measurement.failed:
+        plan = _explain(conn, query, args)
+    current_app.logger.warning(
+        "Slow query %s took %.3fs, rows=%d, failed=%s, parameters=%s, plan=%s",
+        query_name,
+        measurement.duration,
+        measurement.rows,
+        measurement.failed,
+        parameters,
+        plan,
+    )
+
+
+def _call_commit(query, *args, query_name=None):
     conn = get_db_connection()
     context = {}
-    with conn.cursor() as cursor:
-        cursor.execute(query, args)
-        context["lastrowid"] = cursor.lastrowid
-        context["rowcount"] = cursor.rowcount
-    if not g.in_transaction:
-        conn.commit()
+    with _measure(query_name, conn, query, args) as measurement:
+        with conn.cursor() as cursor:
+            cursor.execute(query, args)
+            context["lastrowid"] = cursor.lastrowid
+            context["rowcount"] = cursor.rowcount
+        measurement.rows = max(cursor.rowcount, 0)
+        if not g.in_transaction:
+            conn.commit()
+    if table := _written_table(query):
+        after_commit(partial(current_app.extensions["response_cache"].table_written, table))
     return context
 
 
-def _call_fetchone(query, *args):
+def _call_commit_many(query, rows, query_name=None):
+    # pymysql rewrites a single-row INSERT ... VALUES into multi-row statements
     conn = get_db_connection()
-    with conn.cursor() as cursor:
+    with _measure(query_name, conn, query, rows) as measurement:
+        with conn.cursor() as cursor:
+            cursor.executemany(query, rows)
+        measurement.rows = max(cursor.rowcount, 0)
+        if not g.in_transaction:
+            conn.commit()
+    if table := _written_table(query):
+        after_commit(partial(current_app.extensions["response_cache"].table_written, table))
+
+
+@cache
+def _written_table(query):
+    if match := WRITTEN_TABLE_PATTERN.match(query):
+        return match[1]
+    return None
+
+
+def _call_fetchone(query, *args, query_name=None):
+    conn = get_db_connection()
+    with _measure(query_name, conn, query, args) as measurement, conn.cursor() as cursor:
         cursor.execute(query, args)
-        return cursor.fetchone()
+        result = cursor.fetchone()
+        measurement.rows = int(result is not None)
+        return result
 
 
-def _call_fetchall(query, *args):
+def _call_fetchall(query, *args, query_name=None):
     conn = get_db_connection()
-    with conn.cursor() as cursor:
+    with _measure(query_name, conn, query, args) as measurement, conn.cursor() as cursor:
         cursor.execute(query, args)
-        return cursor.fetchall()
+        results = cursor.fetchall()
+        measurement.rows = len(results)
+        return results
+
+
+def _call_stream(query, *args, query_name=None):
+    # unbuffered, rows are read off the socket as they are consumed and the connection
+    # cannot run anything else until the generator is exhausted or closed
+    conn = get_db_connection()
+    with conn.cursor(pymysql.cursors.SSDictCursor) as cursor:
+        # only timed until the first row arrives, the rest goes at the pace of the consumer,
+        # usually a response being written out to the client
+        with _measure(query_name, conn, query, args) as measurement:
+            cursor.execute(query, args)
+            rows = cursor.fetchall_unbuffered()
+            first = next(rows, None)
+            measurement.rows = int(first is not None)
+        if first is None:
+            return
+        count = 0
+        try:
+            yield first
+            for row in rows:
+                count += 1
+                yield row
+        except Exception:
+            QUERY_ERRORS.inc(query=query_name)
+            raise
+        finally:
+            QUERY_ROWS.inc(count, query=query_name)
+
+
+def setup_app(app):
+    for key, value in SLOW_QUERY_DEFAULTS.items():
+        app.config.setdefault(key, value)
@@ -0,0 +1,121 @@
+from datetime import datetime, timedelta, timezone
+
+import click
+from flask.cli import AppGroup
+
+from app.db import retrying, transaction
+from app.models.model import query
+
+ARCHIVE_BATCH_SIZE = 1000
+
+revisions_cli = AppGroup("revisions")
+
+
+@query
+def get_item_revision_archive_bound(fire, older_than):
+    return fire(older_than)["bound"]
+
+
+@query
+def get_all_archivable_item_revision_ids(fire, after, bound, older_than, limit):
+    # every revision but the newest of each item, revision_count keeps has_revisions intact
+    return [row["_id"] for row in fire(after, bound, older_than, limit)]
+
+
+@query
+def create_item_revision_archive_rows(fire, revision_ids):
+    # IGNORE makes a batch safe to move again if two archive runs overlap
+    fire(tuple(revision_ids))
+
+
+@query
+def delete_item_revisions_by_ids(fire, revision_ids):
+    fire(tuple(revision_ids))
+
+
+@query
+def get_item_comment_revision_archive_bound(fire, older_than):
+    return fire(older_than)["bound"]
+
+
+@query
+def get_all_archivable_item_comment_revision_ids(fire, after, bound, older_than, limit):
+    return [row["_id"] for row in fire(after, bound, older_than, limit)]
+
+
+@query
+def create_item_comment_revision_archive_rows(fire, revision_ids):
+    fire(tuple(revision_ids))
+
+
+@query
+def delete_item_comment_revisions_by_ids(fire, revision_ids):
+    fire(tuple(revision_ids))
+
+
+@retrying
+def _move_batch(create_rows, delete_rows, revision_ids):
+    with transaction():
+        create_rows(revision_ids)
+        delete_rows(revision_ids)
+
+
+def _archive(get_bound, get_ids, create_rows, delete_rows, *, older_than, batch_size):
+    # walks the primary key up to the newest old enough revision, one short transaction per
+    # batch, so writers are never held up for longer than a batch takes to move
+    if (bound := get_bound(older_than)) is None:
+        return
+    after = 0
+    while revision_ids := get_ids(after, bound, older_than, batch_size):
+        _move_batch(create_rows, delete_rows, revision_ids)
+        after = revision_ids[-1]
+        yield len(revision_ids)
+
+
+def archive_item_revisions(older_than, batch_size=ARCHIVE_BATCH_SIZE):
+    yield from _archive(
+        get_item_revision_archive_bound,
+        get_all_archivable_item_revision_ids,
+        create_item_revision_archive_rows,
+        delete_item_revisions_by_ids,
+        older_than=older_than,
+        batch_size=batch_size,
+    )
+
+
+def archive_item_comment_revisions(older_than, batch_size=ARCHIVE_BATCH_SIZE):
+    yield from _archive(
+        get_item_comment_revision_archive_bound,
+        get_all_archivable_item_comment_revision_ids,
+        create_item_comment_revision_archive_rows,
+        delete_item_comment_revisions_by_ids,
+        older_than=older_than,
+        batch_size=batch_size,
+    )
+
+
+@revisions_cli.command("archive")
+@click.option(
+    "--older-than",
+    type=click.IntRange(min=0),
+    required=True,
+    help="Age in days of the revisions to move to the archive tables.",
+)
+@click.option(
+    "--batch-size", type=click.IntRange(min=1), default=ARCHIVE_BATCH_SIZE, show_default=True
+)
+def archive_command(older_than, batch_size):
+    older_than = datetime.now(timezone.utc).replace(tzinfo=None) - timedelta(days=older_than)
+    for name, archive in (
+        ("item", archive_item_revisions),
+        ("item comment", archive_item_comment_revisions),
+    ):
+        archived = 0
+        for count in archive(older_than, batch_size):
+            archived += count
+            click.echo(f"{archived} {name} revisions archived", err=True)
+        click.echo(f"Archived {archived} {name} revisions.")
+
+
+def setup_app(app):
+    app.cli.add_command(revisions_cli)
@@ -0,0 +1,2 @@
+INSERT IGNORE INTO item_comment_revision_archive (_id, _user_id, _datetime, id, text, is_deleted)
+SELECT _id, _user_id, _datetime, id, text, is_deleted FROM item_comment_revision WHERE _id IN %s;
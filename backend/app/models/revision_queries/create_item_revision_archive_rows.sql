@@ -0,0 +1,2 @@
+INSERT IGNORE INTO item_revision_archive (_id, _user_id, _datetime, id, name, description, quantity, unit, is_deleted)
+SELECT _id, _user_id, _datetime, id, name, description, quantity, unit, is_deleted FROM item_revision WHERE _id IN %s;
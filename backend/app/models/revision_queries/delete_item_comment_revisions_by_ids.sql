@@ -0,0 +1 @@
+DELETE FROM item_comment_revision WHERE _id IN %s;
@@ -0,0 +1 @@
+DELETE FROM item_revision WHERE _id IN %s;
@@ -0,0 +1,8 @@
+SELECT _id FROM item_comment_revision AS revision
+WHERE _id > %s AND _id <= %s AND _datetime < %s
+AND EXISTS (
+    SELECT 1 FROM item_comment_revision AS newer
+    WHERE newer.id = revision.id AND newer._id > revision._id
+)
+ORDER BY _id
+LIMIT %s;
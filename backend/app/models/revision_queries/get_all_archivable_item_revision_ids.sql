@@ -0,0 +1,7 @@
+SELECT _id FROM item_revision AS revision
+WHERE _id > %s AND _id <= %s AND _datetime < %s
+AND EXISTS (
+    SELECT 1 FROM item_revision AS newer WHERE newer.id = revision.id AND newer._id > revision._id
+)
+ORDER BY _id
+LIMIT %s;
@@ -0,0 +1 @@
+SELECT MAX(_id) AS bound FROM item_revision WHERE _datetime < %s;
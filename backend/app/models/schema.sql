@@ -1,3 +1,10 @@
+DROP TABLE IF EXISTS schema_migration;
+DROP TABLE IF EXISTS change_marker;
+DROP TABLE IF EXISTS item_tag_revision;
+DROP TABLE IF EXISTS item_snapshot_row;
+DROP TABLE IF EXISTS item_snapshot;
+DROP TABLE IF EXISTS item_revision_archive;
+DROP TABLE IF EXISTS item_comment_revision_archive;
 DROP TABLE IF EXISTS item_comment_revision;
 DROP TABLE IF EXISTS item_comment;
 DROP TABLE IF EXISTS item_tag_junction;
@@ -1,8 +1,42 @@
 from typing import Annotated
 
-from pydantic import Field, TypeAdapter
+from pydantic import BaseModel, Field, TypeAdapter, field_validator
+from pydantic_core import from_json
 
 from app.constants import MIN_PASSWORD_LENGTH
 
 NewPassword = Annotated[str, Field(min_length=MIN_PASSWORD_LENGTH)]
 validate_new_password = TypeAdapter(NewPassword).validate_python
+
+# lengths follow the columns in schema.sql
+TagName = Annotated[str, Field(min_length=1, max_length=100)]
+CommentText = Annotated[str, Field(min_length=1, max_length=2000)]
+
+
+class ItemImportRow(BaseModel):
+    name: Annotated[str, Field(min_length=1, max_length=256)]
+    description: Annotated[str | None, Field(max_length=1024)] = None
+    quantity: Annotated[int, Field(ge=0)] = 0
+    unit: Annotated[str | None, Field(max_length=100)] = None
+    tags: list[TagName] = []
+    comments: list[CommentText] = []
+
+    # accept the objects written by the export as well as bare strings, and JSON text for
+    # the CSV cells holding them
+    @field_validator("tags", mode="before")
+    @classmethod
+    def unwrap_tags(cls, value):
+        if isinstance(value, str):
+            value = from_json(value)
+        if not isinstance(value, list):
+            return value
+        return [tag.get("name") if isinstance(tag, dict) else tag for tag in value]
+
+    @field_validator("comments", mode="before")
+    @classmethod
+    def unwrap_comments(cls, value):
+        if isinstance(value, str):
+            value = from_json(value)
+        if not isinstance(value, list):
+            return value
+        return [comment.get("text") if isinstance(comment, dict) else comment for comment in value]
@@ -1,13 +1,26 @@
+import atexit
+import json
+import threading
+import time
 from dataclasses import dataclass
 from datetime import datetime
 
 import click
+from flask import current_app
 from flask.cli import AppGroup
 from werkzeug.security import gen_salt
 
-from app.constants import PASSWORD_HASHER
+from app.db import retrying, transaction
 from app.models.model import query
 from app.models.types import validate_new_password
+from app.passwords import (
+    CALIBRATION_MAX_TIME_COST,
+    CALIBRATION_MEMORY_COSTS,
+    CALIBRATION_PARALLELISMS,
+    calibrate_hash_parameters,
+    get_password_hasher,
+    recommend_hash_parameters,
+)
 
 user_cli = AppGroup("user")
 
@@ -46,7 +59,7 @@ def get_user_by_id(fire, user_id):
 
 @query
 def update_user_password(fire, user_id, password):
-    password_hash = PASSWORD_HASHER.hash(password)
+    password_hash = get_password_hasher().hash(password)
     fire(password_hash, user_id)
 
 
@@ -55,15 +68,85 @@ def update_user_last_login(fire, user_id):
     fire(user_id)
 
 
+@query
+def update_many_user_last_logins(fire, logins):
+    # logins maps user ids to unix times, an older time never overwrites a newer one
+    rows = [{"id": user_id, "logged_in_at": at} for user_id, at in logins.items()]
+    fire(json.dumps(rows))
+
+
+class LastLoginBuffer:
+    def __init__(self, app, interval):
+        self.app = app
+        # seconds between flushes, 0 writes each login straight away
+        self.interval = interval
+        self._pending = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def record(self, user_id):
+        if not self.interval:
+            update_user_last_login(user_id)
+            return
+        with self._lock:
+            self._pending[user_id] = time.time()
+            # started on first use so that each process of a forking server runs its own
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._run, name="last-login-flush", daemon=True
+                )
+                self._thread.start()
+                atexit.register(self.close)
+
+    def flush(self):
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        if not pending:
+            return
+        try:
+            with self.app.app_context():
+                update_many_user_last_logins(pending)
+        except Exception:
+            self.app.logger.exception("Flushing %d last logins failed", len(pending))
+            with self._lock:
+                # logins recorded in the meantime are newer than the ones put back
+                self._pending = pending | self._pending
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.flush()
+
+    def close(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        self.flush()
+
+
+def record_user_last_login(user_id):
+    # readers may see a last_login up to one flush interval old
+    current_app.extensions["last_login_buffer"].record(user_id)
+
+
 @query
 def create_user(fire, name, password, password_reset_required=True):
-    password_hash = PASSWORD_HASHER.hash(password)
+    password_hash = get_password_hasher().hash(password)
     return fire(name, password_hash, password_reset_required)["lastrowid"]
 
 
+@query
+def update_users_change_marker(fire):
+    fire()
+
+
+@retrying
 @query
 def delete_user_by_name(fire, name):
-    fire(name)
+    # their comments keep going with a NULL user_id, which no revision records
+    with transaction():
+        fire(name)
+        update_users_change_marker()
 
 
 @user_cli.command("delete")
@@ -88,5 +171,67 @@ def new_user_command(name, password):
     click.echo("Done.")
 
 
+@user_cli.command("calibrate-hash")
+@click.option(
+    "--target",
+    type=click.FloatRange(min=0, min_open=True),
+    default=0.5,
+    show_default=True,
+    help="Longest acceptable verify time in seconds.",
+)
+@click.option(
+    "--memory-cost",
+    "memory_costs",
+    type=click.IntRange(min=8),
+    multiple=True,
+    default=CALIBRATION_MEMORY_COSTS,
+    show_default=True,
+    help="Memory cost in KiB to try, repeatable.",
+)
+@click.option(
+    "--parallelism",
+    "parallelisms",
+    type=click.IntRange(min=1),
+    multiple=True,
+    default=CALIBRATION_PARALLELISMS,
+    show_default=True,
+    help="Parallelism to try, repeatable.",
+)
+@click.option(
+    "--max-time-cost",
+    type=click.IntRange(min=1),
+    default=CALIBRATION_MAX_TIME_COST,
+    show_default=True,
+)
+@click.option("--samples", type=click.IntRange(min=1), default=3, show_default=True)
+def calibrate_hash_command(target, memory_costs, parallelisms, max_time_cost, samples):
+    benchmarks = []
+    for benchmark in calibrate_hash_parameters(
+        target,
+        memory_costs=memory_costs,
+        parallelisms=parallelisms,
+        max_time_cost=max_time_cost,
+        samples=samples,
+    ):
+        benchmarks.append(benchmark)
+        parameters = benchmark.parameters
+        click.echo(
+            f"time_cost={parameters.time_cost} memory_cost={parameters.memory_cost} "
+            f"parallelism={parameters.parallelism}: {benchmark.seconds * 1000:.1f}ms",
+            err=True,
+        )
+    if (parameters := recommend_hash_parameters(benchmarks, target)) is None:
+        click.echo(f"No parameters tried verify within {target}s.")
+        return
+    click.echo(f"Recommended for app_config.toml, verifying within {target}s:")
+    click.echo(f"PASSWORD_HASH_TIME_COST = {parameters.time_cost}")
+    click.echo(f"PASSWORD_HASH_MEMORY_COST = {parameters.memory_cost}")
+    click.echo(f"PASSWORD_HASH_PARALLELISM = {parameters.parallelism}")
+
+
 def setup_app(app):
+    app.config.setdefault("LAST_LOGIN_FLUSH_INTERVAL", 5)
+    app.extensions["last_login_buffer"] = LastLoginBuffer(
+        app, app.config["LAST_LOGIN_FLUSH_INTERVAL"]
+    )
     app.cli.add_command(user_cli)
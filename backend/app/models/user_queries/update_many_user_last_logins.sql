@@ -0,0 +1,9 @@
+UPDATE user
+JOIN JSON_TABLE(
+    %s,
+    '$[*]' COLUMNS (id INT PATH '$.id', logged_in_at DECIMAL(16, 6) PATH '$.logged_in_at')
+) AS login ON login.id = user.id
+SET user.last_login = GREATEST(
+    COALESCE(user.last_login, FROM_UNIXTIME(login.logged_in_at)),
+    FROM_UNIXTIME(login.logged_in_at)
+);
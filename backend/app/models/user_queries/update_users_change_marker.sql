@@ -0,0 +1,2 @@
+INSERT INTO change_marker (name, value) VALUES ('users', 1)
+ON DUPLICATE KEY UPDATE value = value + 1;
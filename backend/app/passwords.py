@@ -0,0 +1,152 @@
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict, dataclass
+
+import argon2
+from argon2 import PasswordHasher
+from flask import current_app
+
+from app.metrics import REGISTRY
+
+HASHER_DEFAULTS = {
+    # changing these rehashes each user's password on their next login
+    "PASSWORD_HASH_TIME_COST": argon2.DEFAULT_TIME_COST,
+    # KiB
+    "PASSWORD_HASH_MEMORY_COST": argon2.DEFAULT_MEMORY_COST,
+    "PASSWORD_HASH_PARALLELISM": argon2.DEFAULT_PARALLELISM,
+    # threads running argon2, each one holds the hasher's memory_cost while it works
+    "PASSWORD_HASH_WORKERS": 2,
+    # calls allowed to wait for a free worker before new ones are turned away
+    "PASSWORD_HASH_MAX_PENDING": 8,
+}
+
+# KiB, the first is the OWASP minimum for argon2id
+CALIBRATION_MEMORY_COSTS = (19456, 47104, 65536, 131072)
+CALIBRATION_PARALLELISMS = (1, 2, 4)
+CALIBRATION_MAX_TIME_COST = 8
+CALIBRATION_PASSWORD = "calibration password"
+
+PASSWORD_HASH_REJECTIONS = REGISTRY.counter(
+    "password_hash_rejections_total",
+    "Password hashing calls turned away because the worker pool was saturated.",
+    ("operation",),
+)
+
+
+class HasherBusyError(Exception):
+    pass
+
+
+class HasherPool:
+    def __init__(self, hasher, *, workers, max_pending):
+        self.hasher = hasher
+        # argon2 releases the GIL while hashing, so threads spread it over cores
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="argon2")
+        self._slots = threading.BoundedSemaphore(workers + max_pending)
+
+    def _run(self, operation, *args):
+        if not self._slots.acquire(blocking=False):
+            PASSWORD_HASH_REJECTIONS.inc(operation=operation)
+            raise HasherBusyError
+        try:
+            future = self._executor.submit(self._call, getattr(self.hasher, operation), *args)
+        except BaseException:
+            self._slots.release()
+            raise
+        return future.result()
+
+    def _call(self, func, *args):
+        # released by the worker, before the waiting caller is woken with the result
+        try:
+            return func(*args)
+        finally:
+            self._slots.release()
+
+    def hash(self, password):
+        return self._run("hash", password)
+
+    def verify(self, password_hash, password):
+        return self._run("verify", password_hash, password)
+
+    def check_needs_rehash(self, password_hash):
+        # only parses the encoded parameters, cheap enough for the calling thread
+        return self.hasher.check_needs_rehash(password_hash)
+
+
+@dataclass(frozen=True)
+class HashParameters:
+    time_cost: int
+    memory_cost: int
+    parallelism: int
+
+
+@dataclass
+class HashBenchmark:
+    parameters: HashParameters
+    # median seconds taken by a verify
+    seconds: float
+
+
+def benchmark_hash_parameters(parameters, samples):
+    hasher = PasswordHasher(**asdict(parameters))
+    password_hash = hasher.hash(CALIBRATION_PASSWORD)
+    timings = []
+    for _ in range(samples):
+        start = time.perf_counter()
+        hasher.verify(password_hash, CALIBRATION_PASSWORD)
+        timings.append(time.perf_counter() - start)
+    return HashBenchmark(parameters, statistics.median(timings))
+
+
+def calibrate_hash_parameters(
+    target,
+    *,
+    memory_costs=CALIBRATION_MEMORY_COSTS,
+    parallelisms=CALIBRATION_PARALLELISMS,
+    max_time_cost=CALIBRATION_MAX_TIME_COST,
+    samples=3,
+):
+    # raises time_cost for each memory_cost and parallelism pair until a verify takes longer
+    # than target seconds, yielding every benchmark run along the way
+    for memory_cost in memory_costs:
+        for parallelism in parallelisms:
+            for time_cost in range(1, max_time_cost + 1):
+                parameters = HashParameters(time_cost, memory_cost, parallelism)
+                benchmark = benchmark_hash_parameters(parameters, samples)
+                yield benchmark
+                if benchmark.seconds > target:
+                    break
+
+
+def recommend_hash_parameters(benchmarks, target):
+    # the most memory passes within the target, ties go to fewer threads since logins
+    # already run side by side on the worker pool
+    return max(
+        (benchmark.parameters for benchmark in benchmarks if benchmark.seconds <= target),
+        key=lambda parameters: (
+            parameters.memory_cost * parameters.time_cost,
+            -parameters.parallelism,
+        ),
+        default=None,
+    )
+
+
+def get_password_hasher():
+    return current_app.extensions["password_hasher"]
+
+
+def setup_app(app):
+    for key, value in HASHER_DEFAULTS.items():
+        app.config.setdefault(key, value)
+    hasher = PasswordHasher(
+        time_cost=app.config["PASSWORD_HASH_TIME_COST"],
+        memory_cost=app.config["PASSWORD_HASH_MEMORY_COST"],
+        parallelism=app.config["PASSWORD_HASH_PARALLELISM"],
+    )
+    app.extensions["password_hasher"] = HasherPool(
+        hasher,
+        workers=app.config["PASSWORD_HASH_WORKERS"],
+        max_pending=app.config["PASSWORD_HASH_MAX_PENDING"],
+    )
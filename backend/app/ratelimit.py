@@ -0,0 +1,94 @@
+import heapq
+import threading
+import time
+
+from flask import current_app
+
+from app.metrics import REGISTRY
+
+LOGIN_LIMIT_DEFAULTS = {
+    # attempts allowed at once per username and per client address, 0 disables that limit
+    "LOGIN_USERNAME_BURST": 10,
+    "LOGIN_ADDRESS_BURST": 50,
+    # attempts regained per second
+    "LOGIN_USERNAME_RATE": 0.1,
+    "LOGIN_ADDRESS_RATE": 1,
+    # buckets kept per limit, the fullest are dropped beyond this
+    "LOGIN_LIMIT_MAX_KEYS": 10000,
+}
+
+# share of the key bound freed whenever it is exceeded, so the scan choosing the buckets to
+# drop is paid once per that many new keys
+EVICTION_BATCH = 0.1
+
+RATE_LIMIT_DECISIONS = REGISTRY.counter(
+    "rate_limit_decisions_total",
+    "Attempts checked against each limit by result.",
+    ("limit", "result"),
+)
+RATE_LIMIT_EVICTIONS = REGISTRY.counter(
+    "rate_limit_evictions_total", "Buckets dropped to stay under the key bound.", ("limit",)
+)
+
+
+class TokenBucketLimiter:
+    def __init__(self, name, *, burst, rate, max_keys, clock=time.monotonic):
+        self.name = name
+        self.burst = burst
+        self.rate = rate
+        self.max_keys = max_keys
+        self._clock = clock
+        # key -> (tokens, last update), oldest use first, which settles ties when evicting
+        self._buckets = {}
+        self._lock = threading.Lock()
+
+    def allow(self, key):
+        now = self._clock()
+        with self._lock:
+            tokens, updated = self._buckets.pop(key, (self.burst, now))
+            tokens = min(self.burst, tokens + (now - updated) * self.rate)
+            if allowed := tokens >= 1:
+                tokens -= 1
+            self._buckets[key] = (tokens, now)
+            if len(self._buckets) > self.max_keys:
+                self._evict(now)
+        RATE_LIMIT_DECISIONS.inc(limit=self.name, result="allowed" if allowed else "denied")
+        return allowed
+
+    def _evict(self, now):
+        # a dropped bucket starts over full, so the fullest go first, those that have refilled
+        # anyway ahead of all others; drained keys stay limited while new keys churn through
+        count = len(self._buckets) - self.max_keys + max(1, int(self.max_keys * EVICTION_BATCH))
+        refilled = {
+            key: tokens + (now - updated) * self.rate
+            for key, (tokens, updated) in self._buckets.items()
+        }
+        for key in heapq.nlargest(count, refilled, key=refilled.__getitem__):
+            del self._buckets[key]
+        RATE_LIMIT_EVICTIONS.inc(count, limit=self.name)
+
+
+def login_allowed(username, address):
+    # cheap enough to run before the user lookup and the password verify it protects; behind
+    # a reverse proxy the address is the proxy's unless ProxyFix is configured
+    limiters = current_app.extensions["login_limiters"]
+    if (limiter := limiters.get("address")) and not limiter.allow(address):
+        return False
+    if (limiter := limiters.get("username")) and not limiter.allow(username.casefold()):
+        return False
+    return True
+
+
+def setup_app(app):
+    for key, value in LOGIN_LIMIT_DEFAULTS.items():
+        app.config.setdefault(key, value)
+    app.extensions["login_limiters"] = {
+        name: TokenBucketLimiter(
+            name,
+            burst=app.config[f"LOGIN_{name.upper()}_BURST"],
+            rate=app.config[f"LOGIN_{name.upper()}_RATE"],
+            max_keys=app.config["LOGIN_LIMIT_MAX_KEYS"],
+        )
+        for name in ("username", "address")
+        if app.config[f"LOGIN_{name.upper()}_BURST"]
+    }
@@ -7,6 +7,7 @@ from argon2 import PasswordHasher
 from flask import session
 
 from app.models.user import get_user_by_name
+from app.ratelimit import TokenBucketLimiter
 
 
 @pytest.fixture(autouse=True)
@@ -63,13 +64,38 @@ class TestLogin:
             assert response.status_code == HTTPStatus.UNAUTHORIZED
             assert "user" not in session
 
+    @staticmethod
+    def test_throttled(app, client, new_user):
+        new_user("user", "niceandlonggoodpassword")
+        limiter = TokenBucketLimiter("username", burst=1, rate=0, max_keys=10)
+        with patch.dict(app.extensions["login_limiters"], username=limiter):
+            data = {"username": "user", "password": "wrongpassword"}
+            assert client.post("/auth/login", data=data).status_code == HTTPStatus.UNAUTHORIZED
+            data = {"username": "USER", "password": "niceandlonggoodpassword"}
+            response = client.post("/auth/login", data=data)
+            assert response.status_code == HTTPStatus.TOO_MANY_REQUESTS
+
+    @staticmethod
+    def test_hasher_saturated(app, client, new_user):
+        new_user("user", "niceandlonggoodpassword")
+        with patch.object(app.extensions["password_hasher"], "_slots") as slots:
+            slots.acquire.return_value = False
+            response = client.post(
+                "/auth/login",
+                data={
+                    "username": "user",
+                    "password": "niceandlonggoodpassword",
+                },
+            )
+        assert response.status_code == HTTPStatus.SERVICE_UNAVAILABLE
+
     @staticmethod
     def test_hasher_changed(app, client, new_user):
         username = "user"
         password = "niceandlonggoodpassword"
-        with patch("app.models.user.PASSWORD_HASHER") as mock_hasher:
-            hasher = PasswordHasher(memory_cost=100)
-            mock_hasher.hash = hasher.hash
+        with patch.object(
+            app.extensions["password_hasher"], "hasher", PasswordHasher(memory_cost=100)
+        ):
             new_user(username, password)
         with app.app_context():
             original_user = get_user_by_name(username)
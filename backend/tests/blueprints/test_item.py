@@ -1,9 +1,17 @@
 from dataclasses import asdict
 from http import HTTPStatus
+from unittest.mock import patch
 
 import pytest
 
-from app.models.item import delete_item_by_id, get_all_items, get_item_by_id
+from app.models.item import (
+    delete_item_by_id,
+    delete_item_comment_by_id,
+    get_all_items,
+    get_item_by_id,
+    update_item_by_id,
+)
+from app.models.user import delete_user_by_name
 
 
 @pytest.fixture(autouse=True)
@@ -106,7 +114,8 @@ class TestGetItems:
             response = client.get("/items/")
             assert response.status_code == HTTPStatus.OK
 
-            result = response.json
+            assert response.json["next_cursor"] is None
+            result = response.json["items"]
             assert result[0]["id"] == item_1_id
             assert len(result[0]["tags"]) == 2
             assert len(result[0]["comments"]) == 2
@@ -124,7 +133,35 @@ class TestGetItems:
             new_authenticated_user(client)
             response = client.get("/items/")
             assert response.status_code == HTTPStatus.OK
-            assert len(response.json) == 0
+            assert len(response.json["items"]) == 0
+            assert response.json["next_cursor"] is None
+
+    @staticmethod
+    def test_pagination(client, new_authenticated_user, new_item):
+        with client:
+            user_id = new_authenticated_user(client)
+            item_ids = [new_item(user_id, f"item{i}") for i in range(5)]
+
+            seen = []
+            after = 0
+            while after is not None:
+                response = client.get(f"/items/?after={after}&limit=2")
+                assert response.status_code == HTTPStatus.OK
+                assert len(response.json["items"]) <= 2
+                seen.extend(item["id"] for item in response.json["items"])
+                after = response.json["next_cursor"]
+            assert seen == item_ids
+
+    @staticmethod
+    @pytest.mark.parametrize(
+        "query_string",
+        ("limit=0", "limit=100000", "after=-1", "after=foo"),
+    )
+    def test_pagination_validation_failure(client, new_authenticated_user, query_string):
+        with client:
+            new_authenticated_user(client)
+            response = client.get(f"/items/?{query_string}")
+            assert response.status_code == HTTPStatus.BAD_REQUEST
 
     @staticmethod
     def test_unauthenticated(client):
@@ -256,6 +293,82 @@ class TestUpdateItem:
             )
             assert response.status_code == HTTPStatus.NOT_FOUND
 
+    @staticmethod
+    def test_if_match(client, new_authenticated_user, new_item):
+        with client:
+            user_id = new_authenticated_user(client)
+            item_id = new_item(user_id)
+            response = client.get(f"/items/{item_id}")
+            etag = response.headers["ETag"]
+            item = response.json
+            item["quantity"] = 1
+
+            response = client.put(f"/items/{item_id}", data=item, headers={"If-Match": etag})
+            assert response.status_code == HTTPStatus.NO_CONTENT
+            assert response.headers["ETag"] == client.get(f"/items/{item_id}").headers["ETag"]
+            assert response.headers["ETag"] != etag
+
+            # a second writer holding the old tag loses instead of overwriting
+            item["quantity"] = 2
+            response = client.put(f"/items/{item_id}", data=item, headers={"If-Match": etag})
+            assert response.status_code == HTTPStatus.PRECONDITION_FAILED
+            assert client.get(f"/items/{item_id}").json["quantity"] == 1
+
+    @staticmethod
+    def test_etag_is_own_version(app, client, new_authenticated_user, new_item):
+        with client:
+            user_id = new_authenticated_user(client)
+            item_id = new_item(user_id)
+            response = client.get(f"/items/{item_id}")
+            item, etag = response.json, response.headers["ETag"]
+
+            def update_then_interleave(*args, **kwargs):
+                validator = update_item_by_id(*args, **kwargs)
+                # another PUT commits before the first response goes out
+                update_item_by_id(user_id, item_id, "other writer", None, 0, None)
+                return validator
+
+            item["quantity"] = 1
+            with patch("app.blueprints.item.update_item_by_id", side_effect=update_then_interleave):
+                response = client.put(f"/items/{item_id}", data=item, headers={"If-Match": etag})
+            assert response.status_code == HTTPStatus.NO_CONTENT
+            own_etag = response.headers["ETag"]
+            assert own_etag.startswith(f'"item-{item_id}-2-')
+
+            # the tag covers only the first write, so it can not overwrite the second
+            response = client.put(f"/items/{item_id}", data=item, headers={"If-Match": own_etag})
+            assert response.status_code == HTTPStatus.PRECONDITION_FAILED
+            assert client.get(f"/items/{item_id}").json["name"] == "other writer"
+
+    @staticmethod
+    def test_if_match_ignores_related_rows(client, new_authenticated_user, new_item):
+        with client:
+            user_id = new_authenticated_user(client)
+            item_id = new_item(user_id)
+            response = client.get(f"/items/{item_id}")
+            item, etag = response.json, response.headers["ETag"]
+            client.post(f"/items/{item_id}/comments/", data={"text": "comment"})
+            response = client.put(f"/items/{item_id}", data=item, headers={"If-Match": etag})
+            assert response.status_code == HTTPStatus.NO_CONTENT
+
+    @staticmethod
+    @pytest.mark.parametrize(
+        "if_match, expected",
+        (
+            ("*", HTTPStatus.NO_CONTENT),
+            ('"item-0-1-0-0-0"', HTTPStatus.PRECONDITION_FAILED),
+            ('"comment-1-1"', HTTPStatus.PRECONDITION_FAILED),
+            ('"garbage"', HTTPStatus.PRECONDITION_FAILED),
+        ),
+    )
+    def test_if_match_values(client, new_authenticated_user, new_item, if_match, expected):
+        with client:
+            user_id = new_authenticated_user(client)
+            item_id = new_item(user_id)
+            item = client.get(f"/items/{item_id}").json
+            response = client.put(f"/items/{item_id}", data=item, headers={"If-Match": if_match})
+            assert response.status_code == expected
+
     @staticmethod
     def test_unauthenticated(client):
         with client:
@@ -306,11 +419,11 @@ class TestGetItemRevisions:
         with client:
             user_id = new_authenticated_user(client)
             item_id = new_item(user_id)
-            assert len(client.get(f"/items/{item_id}/revision/").json) == 1
+            assert len(client.get(f"/items/{item_id}/revision/").json["items"]) == 1
             response = client.delete(
                 f"/items/{item_id}",
             )
-            assert len(client.get(f"/items/{item_id}/revision/").json) == 2
+            assert len(client.get(f"/items/{item_id}/revision/").json["items"]) == 2
 
     @staticmethod
     def test_not_found(client, new_authenticated_user):
@@ -318,6 +431,49 @@ class TestGetItemRevisions:
             user_id = new_authenticated_user(client)
             assert client.get(f"/items/1/revision/").status_code == HTTPStatus.NOT_FOUND
 
+    @staticmethod
+    def test_pagination(client, new_authenticated_user, new_item):
+        with client:
+            user_id = new_authenticated_user(client)
+            item_id = new_item(user_id)
+            for delta in (1, 2, 3):
+                client.patch(f"/items/{item_id}/quantity", data={"delta": delta})
+
+            response = client.get(f"/items/{item_id}/revision/?limit=3")
+            assert response.status_code == HTTPStatus.OK
+            assert [revision["quantity"] for revision in response.json["items"]] == [0, 1, 3]
+            cursor = response.json["next_cursor"]
+            assert cursor == response.json["items"][-1]["_id"]
+
+            response = client.get(f"/items/{item_id}/revision/?limit=3&after={cursor}")
+            assert [revision["quantity"] for revision in response.json["items"]] == [6]
+            assert response.json["next_cursor"] is None
+
+    @staticmethod
+    def test_time_range(client, new_authenticated_user, new_item):
+        with client:
+            user_id = new_authenticated_user(client)
+            item_id = new_item(user_id)
+            response = client.get(f"/items/{item_id}/revision/?since=9999-01-01T00:00:00")
+            assert response.status_code == HTTPStatus.OK
+            assert response.json == {"items": [], "next_cursor": None}
+
+            response = client.get(
+                f"/items/{item_id}/revision/?since=2000-01-01T00:00:00Z&until=9999-01-01"
+            )
+            assert len(response.json["items"]) == 1
+
+    @staticmethod
+    @pytest.mark.parametrize(
+        "query_string", ("?limit=0", "?after=-1", "?since=yesterday", "?until=2024-13-01")
+    )
+    def test_validation_failure(client, new_authenticated_user, new_item, query_string):
+        with client:
+            user_id = new_authenticated_user(client)
+            item_id = new_item(user_id)
+            response = client.get(f"/items/{item_id}/revision/{query_string}")
+            assert response.status_code == HTTPStatus.BAD_REQUEST
+
     @staticmethod
     def test_unauthenticated(client):
         with client:
@@ -386,6 +542,109 @@ class TestCreateItemComment:
             assert response.status_code == HTTPStatus.UNAUTHORIZED
 
 
+class TestExportItems:
+    @staticmethod
+    @pytest.mark.parametrize(
+        "query_string, mimetype",
+        (
+            ("", "application/x-ndjson"),
+            ("?format=ndjson", "application/x-ndjson"),
+            ("?format=csv", "text/csv"),
+        ),
+    )
+    def test_success(client, new_authenticated_user, new_item, query_string, mimetype):
+        with client:
+            user_id = new_authenticated_user(client)
+            new_item(user_id, "item1")
+            new_item(user_id, "item2")
+            response = client.get(f"/items/export{query_string}")
+            assert response.status_code == HTTPStatus.OK
+            assert response.mimetype == mimetype
+            assert "attachment" in response.headers["Content-Disposition"]
+            body = response.get_data(as_text=True)
+            assert "item1" in body
+            assert "item2" in body
+
+    @staticmethod
+    def test_validation_failure(client, new_authenticated_user):
+        with client:
+            new_authenticated_user(client)
+            response = client.get("/items/export?format=xml")
+            assert response.status_code == HTTPStatus.BAD_REQUEST
+
+    @staticmethod
+    def test_unauthenticated(client):
+        with client:
+            response = client.get("/items/export")
+            assert response.status_code == HTTPStatus.UNAUTHORIZED
+
+
+class TestUpdateItemQuantity:
+    @staticmethod
+    def test_success(client, new_authenticated_user, new_item):
+        with client:
+            user_id = new_authenticated_user(client)
+            item_id = new_item(user_id, quantity=2)
+            response = client.patch(f"/items/{item_id}/quantity", data={"delta": 3})
+            assert response.status_code == HTTPStatus.OK
+            assert response.json["quantity"] == 5
+            assert client.get(f"/items/{item_id}").json["quantity"] == 5
+
+    @staticmethod
+    def test_insufficient_quantity(client, new_authenticated_user, new_item):
+        with client:
+            user_id = new_authenticated_user(client)
+            item_id = new_item(user_id, quantity=2)
+            response = client.patch(f"/items/{item_id}/quantity", data={"delta": -3})
+            assert response.status_code == HTTPStatus.CONFLICT
+            assert client.get(f"/items/{item_id}").json["quantity"] == 2
+
+    @staticmethod
+    def test_not_found(client, new_authenticated_user):
+        with client:
+            new_authenticated_user(client)
+            response = client.patch("/items/1/quantity", data={"delta": 1})
+            assert response.status_code == HTTPStatus.NOT_FOUND
+
+    @staticmethod
+    def test_deleted(client, new_authenticated_user, new_item):
+        with client:
+            user_id = new_authenticated_user(client)
+            item_id = new_item(user_id, quantity=2)
+            client.delete(f"/items/{item_id}")
+            response = client.patch(f"/items/{item_id}/quantity", data={"delta": 1})
+            assert response.status_code == HTTPStatus.NOT_FOUND
+            # no revision brought the item back to life
+            revisions = client.get(f"/items/{item_id}/revision/").json["items"]
+            assert revisions[-1]["is_deleted"]
+
+    @staticmethod
+    def test_out_of_range(client, new_authenticated_user, new_item):
+        with client:
+            user_id = new_authenticated_user(client)
+            item_id = new_item(user_id, quantity=2)
+            response = client.patch(f"/items/{item_id}/quantity", data={"delta": 2**31 - 2})
+            assert response.status_code == HTTPStatus.CONFLICT
+            assert client.get(f"/items/{item_id}").json["quantity"] == 2
+
+    @staticmethod
+    @pytest.mark.parametrize(
+        "form_data", ({}, {"delta": 0}, {"delta": "many"}, {"delta": 2**31}, {"delta": -(2**31)})
+    )
+    def test_validation_failure(client, new_authenticated_user, new_item, form_data):
+        with client:
+            user_id = new_authenticated_user(client)
+            item_id = new_item(user_id)
+            response = client.patch(f"/items/{item_id}/quantity", data=form_data)
+            assert response.status_code == HTTPStatus.BAD_REQUEST
+
+    @staticmethod
+    def test_unauthenticated(client):
+        with client:
+            response = client.patch("/items/1/quantity", data={"delta": 1})
+            assert response.status_code == HTTPStatus.UNAUTHORIZED
+
+
 class TestUpdateItemComment:
     @staticmethod
     def test_success(client, new_authenticated_user, new_item):
@@ -411,7 +670,7 @@ class TestUpdateItemComment:
             assert response.json["comments"][0]["has_revisions"] == True
             response = client.get(f"/items/comments/{comment_id}/revision/")
             assert response.status_code == HTTPStatus.OK
-            assert len(response.json)
+            assert len(response.json["items"])
 
     @staticmethod
     def test_not_found(client, new_authenticated_user):
@@ -419,6 +678,29 @@ class TestUpdateItemComment:
             user_id = new_authenticated_user(client)
             assert client.put(f"/items/comments/1", data={"text": "foo"}).status_code == HTTPStatus.NOT_FOUND
 
+    @staticmethod
+    def test_if_match(client, new_authenticated_user, new_item, new_item_comment):
+        with client:
+            user_id = new_authenticated_user(client)
+            item_id = new_item(user_id)
+            comment_id = new_item_comment(user_id, item_id)
+            (comment,) = client.get(f"/items/{item_id}").json["comments"]
+            etag = f'"comment-{comment_id}-{comment["version"]}"'
+
+            response = client.put(
+                f"/items/comments/{comment_id}", data={"text": "bar"}, headers={"If-Match": etag}
+            )
+            assert response.status_code == HTTPStatus.NO_CONTENT
+            (comment,) = client.get(f"/items/{item_id}").json["comments"]
+            assert response.headers["ETag"] == f'"comment-{comment_id}-{comment["version"]}"'
+
+            response = client.put(
+                f"/items/comments/{comment_id}", data={"text": "baz"}, headers={"If-Match": etag}
+            )
+            assert response.status_code == HTTPStatus.PRECONDITION_FAILED
+            (comment,) = client.get(f"/items/{item_id}").json["comments"]
+            assert comment["text"] == "bar"
+
     @staticmethod
     def test_unauthenticated(client):
         with client:
@@ -460,3 +742,292 @@ class TestDeleteItemComment:
 
 
 #class TestGetItemCommentRevisions
+
+
+class TestGetItemsAsOf:
+    @staticmethod
+    def test_success(client, new_authenticated_user, new_item):
+        with client:
+            user_id = new_authenticated_user(client)
+            item_id = new_item(user_id, quantity=2)
+            client.patch(f"/items/{item_id}/quantity", data={"delta": 1})
+
+            response = client.get("/items/?as_of=9999-01-01T00:00:00Z")
+            assert response.status_code == HTTPStatus.OK
+            assert response.json["next_cursor"] is None
+            (item,) = response.json["items"]
+            assert (item["id"], item["quantity"]) == (item_id, 3)
+
+            response = client.get("/items/?as_of=2000-01-01")
+            assert response.json == {"items": [], "next_cursor": None}
+
+    @staticmethod
+    def test_validation_failure(client, new_authenticated_user):
+        with client:
+            new_authenticated_user(client)
+            response = client.get("/items/?as_of=last month")
+            assert response.status_code == HTTPStatus.BAD_REQUEST
+
+
+class TestConditionalGet:
+    @staticmethod
+    @pytest.mark.parametrize("path", ("/items/", "/items/{item_id}"))
+    def test_not_modified(client, new_authenticated_user, new_item, path):
+        with client:
+            user_id = new_authenticated_user(client)
+            item_id = new_item(user_id)
+            path = path.format(item_id=item_id)
+            response = client.get(path)
+            assert response.status_code == HTTPStatus.OK
+            etag = response.headers["ETag"]
+
+            response = client.get(path, headers={"If-None-Match": etag})
+            assert response.status_code == HTTPStatus.NOT_MODIFIED
+            assert response.headers["ETag"] == etag
+            assert not response.data
+
+    @staticmethod
+    @pytest.mark.parametrize("path", ("/items/", "/items/{item_id}"))
+    @pytest.mark.parametrize(
+        "change",
+        (
+            lambda client, item_id: client.post(f"/items/{item_id}/comments/", data={"text": "a"}),
+            lambda client, item_id: client.post(f"/items/{item_id}/tags/", data={"name": "a"}),
+            lambda client, item_id: client.put(f"/items/{item_id}", data={"name": "renamed"}),
+        ),
+    )
+    def test_modified(client, new_authenticated_user, new_item, path, change):
+        with client:
+            user_id = new_authenticated_user(client)
+            item_id = new_item(user_id)
+            path = path.format(item_id=item_id)
+            etag = client.get(path).headers["ETag"]
+
+            change(client, item_id)
+
+            response = client.get(path, headers={"If-None-Match": etag})
+            assert response.status_code == HTTPStatus.OK
+            assert response.headers["ETag"] != etag
+
+    @staticmethod
+    @pytest.mark.parametrize("path", ("/items/", "/items/{item_id}"))
+    def test_commenter_deleted(
+        app, client, new_authenticated_user, new_user, new_item, new_item_comment, path
+    ):
+        with client:
+            user_id = new_authenticated_user(client)
+            item_id = new_item(user_id)
+            path = path.format(item_id=item_id)
+            new_item_comment(new_user("commenter"), item_id)
+            etag = client.get(path).headers["ETag"]
+
+            with app.app_context():
+                delete_user_by_name("commenter")
+
+            response = client.get(path, headers={"If-None-Match": etag})
+            assert response.status_code == HTTPStatus.OK
+            assert response.headers["ETag"] != etag
+
+    @staticmethod
+    def test_comment_deleted(app, client, new_authenticated_user, new_item, new_item_comment):
+        with client:
+            user_id = new_authenticated_user(client)
+            item_id = new_item(user_id)
+            item_comment_id = new_item_comment(user_id, item_id)
+            etag = client.get("/items/").headers["ETag"]
+
+            with app.app_context():
+                delete_item_comment_by_id(item_comment_id)
+
+            response = client.get("/items/", headers={"If-None-Match": etag})
+            assert response.status_code == HTTPStatus.OK
+            assert response.headers["ETag"] != etag
+            assert response.json["items"][0]["comments"] == []
+
+    @staticmethod
+    @pytest.mark.parametrize("path", ("/items/", "/items/{item_id}"))
+    def test_tag_removed(client, new_authenticated_user, new_item, path):
+        with client:
+            user_id = new_authenticated_user(client)
+            item_id = new_item(user_id)
+            path = path.format(item_id=item_id)
+            tag_id = client.post(f"/items/{item_id}/tags/", data={"name": "a"}).json["id"]
+            etag = client.get(path).headers["ETag"]
+
+            client.delete(f"/items/{item_id}/tags/{tag_id}")
+
+            response = client.get(path, headers={"If-None-Match": etag})
+            assert response.status_code == HTTPStatus.OK
+            assert response.headers["ETag"] != etag
+
+    @staticmethod
+    def test_pages_have_distinct_etags(client, new_authenticated_user, new_item):
+        with client:
+            user_id = new_authenticated_user(client)
+            new_item(user_id, "item1")
+            new_item(user_id, "item2")
+            first = client.get("/items/?limit=1")
+            second = client.get(f"/items/?limit=1&after={first.json['next_cursor']}")
+            assert first.headers["ETag"] != second.headers["ETag"]
+
+    @staticmethod
+    def test_deleted_item_not_found(client, new_authenticated_user, new_item):
+        with client:
+            user_id = new_authenticated_user(client)
+            item_id = new_item(user_id)
+            client.delete(f"/items/{item_id}")
+            assert client.get(f"/items/{item_id}").status_code == HTTPStatus.NOT_FOUND
+
+
+class TestGetItemChanges:
+    @staticmethod
+    def test_success(app, monkeypatch, client, new_authenticated_user, new_item, new_item_comment):
+        monkeypatch.setitem(app.config, "CHANGES_SETTLE_SECONDS", 0)
+        with client:
+            user_id = new_authenticated_user(client)
+            item_1_id = new_item(user_id, "item1")
+            item_2_id = new_item(user_id, "item2")
+            comment_id = new_item_comment(user_id, item_1_id)
+
+            response = client.get("/items/changes")
+            assert response.status_code == HTTPStatus.OK
+            changes = response.json
+            assert [item["id"] for item in changes["items"]] == [item_1_id, item_2_id]
+            assert [comment["id"] for comment in changes["comments"]] == [comment_id]
+            assert changes["comments"][0]["item_id"] == item_1_id
+
+            client.put(f"/items/{item_2_id}", data={"name": "renamed", "quantity": 2})
+            client.delete(f"/items/comments/{comment_id}")
+
+            response = client.get(f"/items/changes?since={changes['watermark']}")
+            changes = response.json
+            assert len(changes["items"]) == 1
+            assert changes["items"][0]["id"] == item_2_id
+            assert changes["items"][0]["name"] == "renamed"
+            assert changes["items"][0]["quantity"] == 2
+            assert len(changes["comments"]) == 1
+            assert changes["comments"][0]["is_deleted"]
+
+            response = client.get(f"/items/changes?since={changes['watermark']}")
+            assert response.json["items"] == response.json["comments"] == []
+            assert response.json["tags"] == []
+            assert response.json["watermark"] == changes["watermark"]
+
+    @staticmethod
+    def test_tags(app, monkeypatch, client, new_authenticated_user, new_item):
+        monkeypatch.setitem(app.config, "CHANGES_SETTLE_SECONDS", 0)
+        with client:
+            user_id = new_authenticated_user(client)
+            item_id = new_item(user_id)
+            kept_id = client.post(f"/items/{item_id}/tags/", data={"name": "kept"}).json["id"]
+            removed_id = client.post(f"/items/{item_id}/tags/", data={"name": "removed"}).json["id"]
+
+            changes = client.get("/items/changes").json
+            assert [(tag["item_tag_id"], tag["is_deleted"]) for tag in changes["tags"]] == [
+                (kept_id, False),
+                (removed_id, False),
+            ]
+
+            client.delete(f"/items/{item_id}/tags/{removed_id}")
+
+            changes = client.get(f"/items/changes?since={changes['watermark']}").json
+            assert changes["items"] == []
+            assert len(changes["tags"]) == 1
+            assert changes["tags"][0]["item_id"] == item_id
+            assert changes["tags"][0]["name"] == "removed"
+            assert changes["tags"][0]["is_deleted"]
+
+    @staticmethod
+    def test_two_part_watermark(app, monkeypatch, client, new_authenticated_user, new_item):
+        monkeypatch.setitem(app.config, "CHANGES_SETTLE_SECONDS", 0)
+        with client:
+            user_id = new_authenticated_user(client)
+            item_id = new_item(user_id)
+            client.post(f"/items/{item_id}/tags/", data={"name": "tag"})
+            response = client.get("/items/changes?since=0.0")
+            assert response.status_code == HTTPStatus.OK
+            assert len(response.json["tags"]) == 1
+
+    @staticmethod
+    def test_unsettled_changes_held_back(app, client, new_authenticated_user, new_item):
+        with client:
+            user_id = new_authenticated_user(client)
+            new_item(user_id)
+            response = client.get("/items/changes?since=0.0.0")
+            assert response.json["items"] == []
+            assert response.json["watermark"] == "0.0.0"
+
+    @staticmethod
+    @pytest.mark.parametrize("since", ("1", "a.b", "-1.0", "1.2.3.4"))
+    def test_validation_failure(client, new_authenticated_user, since):
+        with client:
+            new_authenticated_user(client)
+            response = client.get(f"/items/changes?since={since}")
+            assert response.status_code == HTTPStatus.BAD_REQUEST
+
+    @staticmethod
+    def test_unauthenticated(client):
+        with client:
+            response = client.get("/items/changes")
+            assert response.status_code == HTTPStatus.UNAUTHORIZED
+
+
+class TestCreateItemsBulk:
+    @staticmethod
+    def test_success(client, new_authenticated_user):
+        with client:
+            new_authenticated_user(client)
+            payload = [
+                {"name": "item1"},
+                {"name": "item2", "description": "description", "quantity": 3, "unit": "box"},
+            ]
+            response = client.post("/items/bulk", json=payload)
+            assert response.status_code == HTTPStatus.OK
+            assert response.json["errors"] == []
+            ids = response.json["ids"]
+            assert len(ids) == 2
+
+            items = client.get("/items/").json["items"]
+            assert [item["id"] for item in items] == ids
+            assert items[1]["quantity"] == 3
+            assert len(client.get(f"/items/{ids[0]}/revision/").json["items"]) == 1
+
+    @staticmethod
+    def test_partial_failure(client, new_authenticated_user, new_item):
+        with client:
+            user_id = new_authenticated_user(client)
+            new_item(user_id, "existing")
+            payload = [
+                {"name": "existing"},
+                {"name": "new"},
+                {"quantity": 1},
+                {"name": "NEW"},
+                {"name": "other", "quantity": -1},
+            ]
+            response = client.post("/items/bulk", json=payload)
+            assert response.status_code == HTTPStatus.OK
+            ids = response.json["ids"]
+            assert ids[0] is None
+            assert ids[1] is not None
+            assert ids[2:] == [None, None, None]
+            errors = response.json["errors"]
+            assert [error["index"] for error in errors] == [0, 2, 3, 4]
+            assert errors[0]["errors"][0]["type"] == "duplicate"
+            assert errors[1]["errors"][0]["type"] == "missing"
+            assert errors[2]["errors"][0]["type"] == "duplicate"
+            assert errors[3]["errors"][0]["type"] == "greater_than_equal"
+            assert len(client.get("/items/").json["items"]) == 2
+
+    @staticmethod
+    @pytest.mark.parametrize("payload", ([], {"name": "item"}))
+    def test_validation_failure(client, new_authenticated_user, payload):
+        with client:
+            new_authenticated_user(client)
+            response = client.post("/items/bulk", json=payload)
+            assert response.status_code == HTTPStatus.BAD_REQUEST
+
+    @staticmethod
+    def test_unauthenticated(client):
+        with client:
+            response = client.post("/items/bulk", json=[{"name": "item"}])
+            assert response.status_code == HTTPStatus.UNAUTHORIZED
@@ -24,6 +24,13 @@ def app():
         "DATABASE_PASSWORD": "inventory_test_password",
         "SECRET_KEY": "myvoiceismypassport",
         "TESTING": True,
+        # exercise cache invalidation throughout the suite
+        "RESPONSE_CACHE_MAX_BYTES": 1024 * 1024,
+        # every test logs in from the same address, the limits get their own tests
+        "LOGIN_USERNAME_BURST": 0,
+        "LOGIN_ADDRESS_BURST": 0,
+        # logins are read back straight after they happen
+        "LAST_LOGIN_FLUSH_INTERVAL": 0,
     }
     app = create_app(config)
     return app
@@ -52,6 +59,12 @@ def truncate_all(app):
         with conn.cursor() as cursor:
             cursor.execute("SET FOREIGN_KEY_CHECKS = 0;")
             query = (
+                "TRUNCATE change_marker;"
+                "TRUNCATE item_tag_revision;"
+                "TRUNCATE item_snapshot_row;"
+                "TRUNCATE item_snapshot;"
+                "TRUNCATE item_revision_archive;"
+                "TRUNCATE item_comment_revision_archive;"
                 "TRUNCATE item_comment_revision;"
                 "TRUNCATE item_comment;"
                 "TRUNCATE item_tag_junction;"
@@ -62,3 +75,4 @@ def truncate_all(app):
             )
             cursor.execute(query)
             cursor.execute("SET FOREIGN_KEY_CHECKS = 1;")
+    app.extensions["response_cache"].invalidate()
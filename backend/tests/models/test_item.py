@@ -1,31 +1,57 @@
+import csv
+import io
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import asdict
+from datetime import datetime
 from unittest.mock import patch
 
 import pytest
-from pymysql.err import IntegrityError
-
-from app.db import get_db_connection, NotFoundError
+from pymysql.err import IntegrityError, OperationalError
+
+from app.db import (
+    connect,
+    get_db_connection,
+    InsufficientQuantityError,
+    NotFoundError,
+    transaction,
+    VersionMismatchError,
+)
 from app.models.item import (
+    ExportFormat,
+    AssemblyMode,
     create_item,
     create_item_comment,
     create_item_tag,
+    create_item_snapshot,
     create_item_tag_association,
+    create_many_items,
     delete_item_by_id,
     delete_item_comment_by_id,
     delete_item_tag_association,
     delete_item_tag_by_id,
+    export_items,
     get_all_item_comment_revisions_by_origin_id,
+    get_all_item_comment_revisions_page,
     get_all_item_revisions_by_origin_id,
+    get_all_item_revisions_page,
     get_all_item_tags,
     get_all_items,
+    get_all_items_as_of_page,
     get_all_joined_items,
+    get_all_joined_items_page,
     get_item_by_id,
+    get_item_changes,
+    get_item_comment_by_id,
     get_joined_item_by_id,
+    get_locked_item_by_id,
+    import_items,
     update_item_by_id,
     update_item_comment_deletion_flag_by_id,
     update_item_deletion_flag_by_id,
     update_item_comment_by_id,
+    update_item_quantity_by_id,
 )
+from app.models.types import ItemImportRow
 
 
 @pytest.fixture(autouse=True)
@@ -177,6 +203,107 @@ class TestUpdateItemById:
             assert asdict(get_item_by_id(item_id))["name"] == "initial_name"
 
 
+class TestUpdateItemQuantityById:
+    @staticmethod
+    def test_success(app, new_user, new_item):
+        with app.app_context():
+            user_id = new_user()
+            item_id = new_item(user_id, quantity=5)
+            item = update_item_quantity_by_id(user_id, item_id, -3)
+            assert item.quantity == 2
+            assert get_item_by_id(item_id).quantity == 2
+            revisions = get_all_item_revisions_by_origin_id(item_id)
+            assert [revision.quantity for revision in revisions] == [5, 2]
+
+    @staticmethod
+    def test_insufficient_quantity(app, new_user, new_item):
+        with app.app_context():
+            user_id = new_user()
+            item_id = new_item(user_id, quantity=1)
+            with pytest.raises(InsufficientQuantityError):
+                update_item_quantity_by_id(user_id, item_id, -2)
+            assert get_item_by_id(item_id).quantity == 1
+            assert len(get_all_item_revisions_by_origin_id(item_id)) == 1
+
+    @staticmethod
+    def test_not_found(app, new_user):
+        with app.app_context():
+            user_id = new_user()
+            with pytest.raises(NotFoundError):
+                update_item_quantity_by_id(user_id, 1, 1)
+
+    @staticmethod
+    def test_concurrent_adjustments(app, new_user, new_item):
+        with app.app_context():
+            user_id = new_user()
+            item_id = new_item(user_id, quantity=10)
+
+        def adjust(_):
+            with app.app_context():
+                try:
+                    update_item_quantity_by_id(user_id, item_id, -1)
+                except InsufficientQuantityError:
+                    return False
+                return True
+
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            results = list(executor.map(adjust, range(20)))
+
+        assert results.count(True) == 10
+        with app.app_context():
+            assert get_item_by_id(item_id).quantity == 0
+            assert len(get_all_item_revisions_by_origin_id(item_id)) == 11
+
+
+class TestUpdateItemByIdVersion:
+    @staticmethod
+    def test_match(app, new_user, new_item):
+        with app.app_context():
+            user_id = new_user()
+            item_id = new_item(user_id)
+            validator = update_item_by_id(user_id, item_id, "updated", None, 0, None, version=1)
+            assert validator.startswith("2-")
+            update_item_by_id(user_id, item_id, "updated again", None, 0, None, version=2)
+            assert get_item_by_id(item_id).name == "updated again"
+
+    @staticmethod
+    def test_mismatch(app, new_user, new_item):
+        with app.app_context():
+            user_id = new_user()
+            item_id = new_item(user_id)
+            update_item_by_id(user_id, item_id, "updated", None, 0, None, version=1)
+            with pytest.raises(VersionMismatchError):
+                update_item_by_id(user_id, item_id, "lost update", None, 0, None, version=1)
+            assert get_item_by_id(item_id).name == "updated"
+            assert len(get_all_item_revisions_by_origin_id(item_id)) == 2
+
+    @staticmethod
+    def test_unchanged_values(app, new_user, new_item):
+        with app.app_context():
+            user_id = new_user()
+            item_id = new_item(user_id, "item")
+            update_item_by_id(user_id, item_id, "item", None, 0, None, version=1)
+            with pytest.raises(VersionMismatchError):
+                update_item_by_id(user_id, item_id, "item", None, 0, None, version=1)
+
+    @staticmethod
+    def test_not_found(app, new_user):
+        with app.app_context():
+            user_id = new_user()
+            with pytest.raises(NotFoundError):
+                update_item_by_id(user_id, 1, "item", None, 0, None, version=1)
+
+
+def test_update_item_comment_by_id_version(app, new_user, new_item, new_item_comment):
+    with app.app_context():
+        user_id = new_user()
+        comment_id = new_item_comment(user_id, new_item(user_id))
+        assert update_item_comment_by_id(user_id, comment_id, "edited", version=1) == 2
+        with pytest.raises(VersionMismatchError):
+            update_item_comment_by_id(user_id, comment_id, "lost update", version=1)
+        assert get_item_comment_by_id(comment_id).text == "edited"
+
+
 def test_delete_item_by_id(
     app,
     new_user,
@@ -225,14 +352,18 @@ def test_get_joined_item_by_id_fail(app):
             result = get_joined_item_by_id(1)
 
 
+@pytest.mark.parametrize("assembly_mode", tuple(AssemblyMode))
 def test_get_all_joined_items(
     app,
+    monkeypatch,
     new_user,
     new_item,
     new_item_comment,
     new_item_tag,
     new_item_tag_association,
+    assembly_mode,
 ):
+    monkeypatch.setitem(app.config, "JOINED_ITEM_ASSEMBLY", assembly_mode)
     with app.app_context():
         user_id = new_user()
 
@@ -294,6 +425,70 @@ def test_get_all_joined_items(
         assert len(item_3.comments) == 0
 
 
+@pytest.mark.parametrize("assembly_mode", tuple(AssemblyMode))
+def test_get_all_joined_items_page(
+    app,
+    monkeypatch,
+    new_user,
+    new_item,
+    new_item_comment,
+    new_item_tag,
+    new_item_tag_association,
+    assembly_mode,
+):
+    monkeypatch.setitem(app.config, "JOINED_ITEM_ASSEMBLY", assembly_mode)
+    with app.app_context():
+        user_id = new_user()
+        tag_id = new_item_tag(user_id, "tag")
+        item_ids = []
+        for i in range(5):
+            item_id = new_item(user_id, f"item{i}")
+            new_item_tag_association(item_id, tag_id)
+            new_item_comment(user_id, item_id, "comment1")
+            new_item_comment(user_id, item_id, "comment2")
+            item_ids.append(item_id)
+        update_item_deletion_flag_by_id(user_id, item_ids.pop(2))
+
+        page = get_all_joined_items_page(0, 2)
+        assert [item.id for item in page.items] == item_ids[:2]
+        assert page.next_cursor == item_ids[1]
+        assert all(len(item.tags) == 1 and len(item.comments) == 2 for item in page.items)
+
+        page = get_all_joined_items_page(page.next_cursor, 2)
+        assert [item.id for item in page.items] == item_ids[2:]
+        assert page.next_cursor is None
+
+        page = get_all_joined_items_page(item_ids[-1], 2)
+        assert page.items == []
+        assert page.next_cursor is None
+
+
+def test_get_all_joined_items_assembly_modes_agree(
+    app,
+    monkeypatch,
+    new_user,
+    new_item,
+    new_item_comment,
+    new_item_tag,
+    new_item_tag_association,
+):
+    with app.app_context():
+        user_id = new_user()
+        tag_ids = [new_item_tag(user_id, f"tag{i}") for i in range(3)]
+        for i in range(3):
+            item_id = new_item(user_id, f"item{i}")
+            for tag_id in tag_ids[: i + 1]:
+                new_item_tag_association(item_id, tag_id)
+            for j in range(i):
+                new_item_comment(user_id, item_id, f"comment{i}-{j}")
+
+        results = []
+        for assembly_mode in AssemblyMode:
+            monkeypatch.setitem(app.config, "JOINED_ITEM_ASSEMBLY", assembly_mode)
+            results.append(get_all_joined_items())
+        assert results[0] == results[1]
+
+
 class TestCreateItemComment:
     @staticmethod
     def test_success(app, new_item, new_user):
@@ -455,6 +650,21 @@ def test_create_item_tag_association(app, new_user, new_item, new_item_tag):
         delete_item_tag_association(item_id, tag_id)
 
 
+def test_delete_item_tag_records_removals(app, monkeypatch, new_user, new_item, new_item_tag):
+    monkeypatch.setitem(app.config, "CHANGES_SETTLE_SECONDS", 0)
+    with app.app_context():
+        user_id = new_user()
+        item_ids = [new_item(user_id, "item1"), new_item(user_id, "item2")]
+        tag_id = new_item_tag("tag")
+        for item_id in item_ids:
+            create_item_tag_association(item_id, tag_id)
+        delete_item_tag_by_id(tag_id)
+        tags = get_item_changes(0, 0).tags
+        assert [(tag.item_id, tag.name, tag.is_deleted) for tag in tags] == [
+            (item_id, "tag", True) for item_id in item_ids
+        ]
+
+
 class TestUpdateItemDeletionFlag:
     @staticmethod
     def test_success(app, new_user, new_item):
@@ -503,6 +713,29 @@ class TestUpdateItemDeletionFlag:
                 assert not result["is_deleted"]
 
 
+def test_deletion_locks_only_the_row(app, new_user, new_item):
+    with app.app_context():
+        user_id = new_user()
+        locked_id = new_item(user_id, "locked")
+        other_id = new_item(user_id, "other")
+        other_conn = connect(app.config)
+        try:
+            with other_conn.cursor() as cursor:
+                cursor.execute("SET SESSION innodb_lock_wait_timeout = 1;")
+            # holds the lock update_item_deletion_flag_by_id takes, for the whole block
+            with transaction():
+                get_locked_item_by_id(locked_id)
+                with other_conn.cursor() as cursor:
+                    cursor.execute("INSERT INTO item (name) VALUES ('new');")
+                    cursor.execute("UPDATE item SET quantity = 1 WHERE id = %s;", (other_id,))
+                    other_conn.commit()
+                    with pytest.raises(OperationalError):
+                        cursor.execute("UPDATE item SET quantity = 1 WHERE id = %s;", (locked_id,))
+                    other_conn.rollback()
+        finally:
+            other_conn.close()
+
+
 class TestUpdateItemCommentDeletionFlag:
     @staticmethod
     def test_success(app, new_user, new_item, new_item_comment):
@@ -550,3 +783,474 @@ class TestUpdateItemCommentDeletionFlag:
                 cursor.execute("SELECT * FROM item WHERE id = %s", (item_id,))
                 result = cursor.fetchone()
                 assert not result["is_deleted"]
+
+
+def test_revision_counts(app, new_user, new_item, new_item_comment):
+    with app.app_context():
+        user_id = new_user()
+        item_id = new_item(user_id)
+        comment_id = new_item_comment(user_id, item_id)
+        update_item_by_id(user_id, item_id, "updated_name", None, 1, None)
+        update_item_comment_by_id(user_id, comment_id, "updated_text")
+        update_item_comment_by_id(user_id, comment_id, "updated_text_again")
+
+        conn = get_db_connection()
+        with conn.cursor() as cursor:
+            cursor.execute("SELECT revision_count FROM item WHERE id = %s", (item_id,))
+            assert cursor.fetchone()["revision_count"] == 2
+            cursor.execute("SELECT revision_count FROM item_comment WHERE id = %s", (comment_id,))
+            assert cursor.fetchone()["revision_count"] == 3
+
+
+def test_backfill_revision_counts_command(app, cli_runner, new_user, new_item, new_item_comment):
+    with app.app_context():
+        user_id = new_user()
+        item_id = new_item(user_id)
+        comment_id = new_item_comment(user_id, item_id)
+        update_item_by_id(user_id, item_id, "updated_name", None, 1, None)
+        update_item_comment_by_id(user_id, comment_id, "updated_text")
+
+        conn = get_db_connection()
+        with conn.cursor() as cursor:
+            cursor.execute("UPDATE item SET revision_count = 0")
+            cursor.execute("UPDATE item_comment SET revision_count = 0")
+        conn.commit()
+        result = get_joined_item_by_id(item_id)
+        assert not result.has_revisions
+        assert not result.comments[0].has_revisions
+
+    result = cli_runner.invoke(args="item backfill-revision-counts")
+    assert result.exception is None
+
+    with app.app_context():
+        result = get_joined_item_by_id(item_id)
+        assert result.has_revisions
+        assert result.comments[0].has_revisions
+
+
+class TestCreateManyItems:
+    @staticmethod
+    def test_success(app, new_user, new_item):
+        with app.app_context():
+            user_id = new_user()
+            new_item(user_id, "existing")
+            ids = create_many_items(
+                user_id,
+                [
+                    ("item1", None, 0, None),
+                    ("existing", None, 0, None),
+                    ("item2", "description", 2, "unit"),
+                    ("item1", None, 5, None),
+                ],
+            )
+            assert ids[1] is None
+            assert ids[3] is None
+            item = get_item_by_id(ids[2])
+            assert asdict(item) == {
+                "id": ids[2],
+                "name": "item2",
+                "description": "description",
+                "quantity": 2,
+                "unit": "unit",
+            }
+            revisions = get_all_item_revisions_by_origin_id(ids[0])
+            assert len(revisions) == 1
+            assert revisions[0]._user_id == user_id
+            assert not get_joined_item_by_id(ids[0]).has_revisions
+
+    @staticmethod
+    def test_empty(app, new_user):
+        with app.app_context():
+            assert create_many_items(new_user(), []) == []
+
+    @staticmethod
+    def test_collation_duplicates(app, new_user, new_item):
+        # names equal under the column's accent and case insensitive collation but not in
+        # python are skipped per row instead of failing the insert
+        with app.app_context():
+            user_id = new_user()
+            new_item(user_id, "Café")
+            ids = create_many_items(
+                user_id,
+                [
+                    ("Cafe", None, 0, None),
+                    ("résumé", None, 0, None),
+                    ("RESUME", None, 0, None),
+                ],
+            )
+            assert ids[0] is None
+            assert ids[2] is None
+            assert get_item_by_id(ids[1]).name == "résumé"
+            assert len(get_all_items()) == 2
+
+    @staticmethod
+    def test_transaction_integrity(app, new_user):
+        with app.app_context():
+            user_id = new_user()
+            with (
+                pytest.raises(RuntimeError),
+                patch("app.models.item.create_many_item_revisions") as mock_func,
+            ):
+                mock_func.side_effect = RuntimeError("Induced failure.")
+                create_many_items(user_id, [("item1", None, 0, None)])
+            assert len(get_all_items()) == 0
+
+
+class TestExportItems:
+    @staticmethod
+    def test_ndjson(
+        app, new_user, new_item, new_item_comment, new_item_tag, new_item_tag_association
+    ):
+        with app.app_context():
+            user_id = new_user()
+            item_1_id = new_item(user_id, "item1")
+            item_2_id = new_item(user_id, "item2")
+            tag_id = new_item_tag(user_id, "tag")
+            new_item_tag_association(item_1_id, tag_id)
+            new_item_comment(user_id, item_1_id, "comment1")
+            new_item_comment(user_id, item_1_id, "comment2")
+            # a tiny chunk size forces one chunk per item
+            chunks = list(export_items(ExportFormat.NDJSON, chunk_size=1))
+            assert len(chunks) == 2
+            lines = [app.json.loads(chunk) for chunk in chunks]
+            assert lines == [asdict(item) for item in get_all_joined_items()]
+            assert lines[0]["id"] == item_1_id
+            assert [comment["text"] for comment in lines[0]["comments"]] == [
+                "comment1",
+                "comment2",
+            ]
+            assert lines[1]["id"] == item_2_id
+
+    @staticmethod
+    def test_csv(app, new_user, new_item, new_item_tag, new_item_tag_association):
+        with app.app_context():
+            user_id = new_user()
+            item_id = new_item(user_id, "item, with comma", quantity=3)
+            new_item_tag_association(item_id, new_item_tag(user_id, "tag"))
+            rows = list(csv.reader(io.StringIO("".join(export_items(ExportFormat.CSV)))))
+            assert rows == [
+                ["id", "name", "description", "quantity", "unit", "tags", "comments"],
+                [str(item_id), "item, with comma", "", "3", "", '["tag"]', "[]"],
+            ]
+
+    @staticmethod
+    def test_empty(app):
+        with app.app_context():
+            assert list(export_items(ExportFormat.NDJSON)) == []
+
+
+def test_export_command(app, cli_runner, new_user, new_item):
+    with app.app_context():
+        user_id = new_user()
+        new_item(user_id, "item1")
+        new_item(user_id, "item2")
+    result = cli_runner.invoke(args="item export --format ndjson")
+    assert result.exit_code == 0
+    names = [app.json.loads(line)["name"] for line in result.output.splitlines()]
+    assert names == ["item1", "item2"]
+
+
+class TestImportItems:
+    @staticmethod
+    def test_success(app, new_user, new_item, new_item_tag):
+        with app.app_context():
+            user_id = new_user()
+            new_item(user_id, "existing")
+            existing_tag_id = new_item_tag(user_id, "tag1")
+            rows = [
+                ItemImportRow(name="item1", quantity=2, tags=["TAG1", "tag2"], comments=["a", "b"]),
+                ItemImportRow(name="existing", tags=["tag3"], comments=["c"]),
+                ItemImportRow(name="item2", tags=["tag2", "tag2"]),
+            ]
+            ids = import_items(user_id, rows)
+            assert ids[1] is None
+
+            item_1 = get_joined_item_by_id(ids[0])
+            assert item_1.quantity == 2
+            assert {tag.name: tag.id for tag in item_1.tags}["tag1"] == existing_tag_id
+            assert sorted(tag.name for tag in item_1.tags) == ["tag1", "tag2"]
+            assert [comment.text for comment in item_1.comments] == ["a", "b"]
+            assert not any(comment.has_revisions for comment in item_1.comments)
+            for comment in item_1.comments:
+                assert len(get_all_item_comment_revisions_by_origin_id(comment.id)) == 1
+            assert len(get_all_item_revisions_by_origin_id(ids[0])) == 1
+
+            assert [tag.name for tag in get_joined_item_by_id(ids[2]).tags] == ["tag2"]
+            # the skipped row created neither its tag nor its comment
+            assert sorted(tag.name for tag in get_all_item_tags()) == ["tag1", "tag2"]
+
+    @staticmethod
+    def test_collation_equal_tags(app, new_user, new_item_tag):
+        with app.app_context():
+            user_id = new_user()
+            existing_tag_id = new_item_tag(user_id, "Café")
+            rows = [
+                ItemImportRow(name="item1", tags=["Cafe", "CAFÉ"]),
+                ItemImportRow(name="item2", tags=["thé", "The"]),
+            ]
+            ids = import_items(user_id, rows)
+            (tag,) = get_joined_item_by_id(ids[0]).tags
+            assert tag.id == existing_tag_id
+            # two new names equal to each other end up as one tag
+            (tag,) = get_joined_item_by_id(ids[1]).tags
+            assert tag.name == "thé"
+            assert len(get_all_item_tags()) == 2
+
+    @staticmethod
+    def test_transaction_integrity(app, new_user):
+        with app.app_context():
+            user_id = new_user()
+            with (
+                pytest.raises(RuntimeError),
+                patch("app.models.item.create_many_item_comments") as mock_func,
+            ):
+                mock_func.side_effect = RuntimeError("Induced failure.")
+                import_items(user_id, [ItemImportRow(name="item", tags=["tag"], comments=["c"])])
+            assert len(get_all_items()) == 0
+            assert len(get_all_item_tags()) == 0
+
+
+class TestImportCommand:
+    @staticmethod
+    def test_round_trip(app, cli_runner, tmp_path, new_user, new_item, new_item_comment):
+        with app.app_context():
+            user_id = new_user()
+            item_id = new_item(user_id, "item1", quantity=4)
+            new_item_comment(user_id, item_id, "comment")
+        for export_format in ExportFormat:
+            path = tmp_path / f"items.{export_format}"
+            cli_runner.invoke(args=f"item export --format {export_format} --output {path}")
+            with app.app_context():
+                delete_item_by_id(item_id)
+            result = cli_runner.invoke(args=f"item import {path} --user user")
+            assert result.exit_code == 0, result.output
+            with app.app_context():
+                (item,) = get_all_joined_items()
+                assert (item.name, item.quantity) == ("item1", 4)
+                assert [comment.text for comment in item.comments] == ["comment"]
+                item_id = item.id
+
+    @staticmethod
+    def test_batches(app, cli_runner, tmp_path, new_user):
+        new_user()
+        path = tmp_path / "items.ndjson"
+        lines = [f'{{"name": "item{index}"}}' for index in range(5)]
+        lines.insert(2, '{"quantity": -1}')
+        lines.insert(4, "not json")
+        lines.append('{"name": "item0"}')
+        path.write_text("\n".join(lines))
+
+        result = cli_runner.invoke(args=f"item import {path} --user user --batch-size 2")
+        assert result.exit_code == 0
+        assert "Record 3 skipped" in result.output
+        assert "Record 5 skipped" in result.output
+        assert "Item item0 skipped" in result.output
+        assert "8 records processed, 5 items imported" in result.output
+        with app.app_context():
+            assert sorted(item.name for item in get_all_items()) == [
+                f"item{index}" for index in range(5)
+            ]
+
+    @staticmethod
+    def test_csv(app, cli_runner, tmp_path, new_user):
+        new_user()
+        path = tmp_path / "items.csv"
+        path.write_text('name,quantity,unit,tags\nitem,3,,"[""tag""]"\n')
+        result = cli_runner.invoke(args=f"item import {path} --user user")
+        assert result.exit_code == 0
+        with app.app_context():
+            (item,) = get_all_joined_items()
+            assert (item.name, item.quantity, item.unit) == ("item", 3, None)
+            assert [tag.name for tag in item.tags] == ["tag"]
+
+    @staticmethod
+    def test_unknown_user(cli_runner, tmp_path):
+        path = tmp_path / "items.ndjson"
+        path.write_text('{"name": "item"}')
+        result = cli_runner.invoke(args=f"item import {path} --user nobody")
+        assert result.exit_code != 0
+        assert "No user named nobody" in result.output
+
+
+class TestGetAllItemRevisionsPage:
+    @staticmethod
+    def test_pages(app, new_user, new_item):
+        with app.app_context():
+            user_id = new_user()
+            item_id = new_item(user_id)
+            for _ in range(4):
+                update_item_quantity_by_id(user_id, item_id, 1)
+            revision_ids = [
+                revision._id for revision in get_all_item_revisions_by_origin_id(item_id)
+            ]
+
+            page = get_all_item_revisions_page(item_id, limit=2)
+            assert [revision._id for revision in page.items] == revision_ids[:2]
+            assert page.next_cursor == revision_ids[1]
+            page = get_all_item_revisions_page(item_id, page.next_cursor, 2)
+            assert [revision._id for revision in page.items] == revision_ids[2:4]
+            page = get_all_item_revisions_page(item_id, page.next_cursor, 2)
+            assert [revision._id for revision in page.items] == revision_ids[4:]
+            assert page.next_cursor is None
+
+    @staticmethod
+    def test_time_range(app, new_user, new_item):
+        with app.app_context():
+            user_id = new_user()
+            item_id = new_item(user_id)
+            update_item_quantity_by_id(user_id, item_id, 1)
+            first, second = get_all_item_revisions_by_origin_id(item_id)
+            with get_db_connection().cursor() as cursor:
+                cursor.execute(
+                    "UPDATE item_revision SET _datetime = %s WHERE _id = %s;",
+                    (datetime(2020, 1, 1), first._id),
+                )
+            get_db_connection().commit()
+
+            page = get_all_item_revisions_page(item_id, since=datetime(2021, 1, 1))
+            assert [revision._id for revision in page.items] == [second._id]
+            page = get_all_item_revisions_page(item_id, until=datetime(2021, 1, 1))
+            assert [revision._id for revision in page.items] == [first._id]
+            page = get_all_item_revisions_page(
+                item_id, since=datetime(2019, 1, 1), until=datetime(2020, 1, 1)
+            )
+            assert page.items == []
+
+    @staticmethod
+    def test_not_found(app):
+        with app.app_context(), pytest.raises(NotFoundError):
+            get_all_item_revisions_page(1)
+
+
+class TestGetAllItemCommentRevisionsPage:
+    @staticmethod
+    def test_pages(app, new_user, new_item, new_item_comment):
+        with app.app_context():
+            user_id = new_user()
+            comment_id = new_item_comment(user_id, new_item(user_id))
+            update_item_comment_by_id(user_id, comment_id, "edited")
+
+            page = get_all_item_comment_revisions_page(comment_id, limit=1)
+            assert [revision.text for revision in page.items] == ["test comment"]
+            page = get_all_item_comment_revisions_page(comment_id, page.next_cursor, 1)
+            assert [revision.text for revision in page.items] == ["edited"]
+            assert page.next_cursor is None
+
+    @staticmethod
+    def test_not_found(app):
+        with app.app_context(), pytest.raises(NotFoundError):
+            get_all_item_comment_revisions_page(1)
+
+
+def set_revision_datetimes(item_id, *datetimes):
+    with get_db_connection().cursor() as cursor:
+        cursor.execute("SELECT _id FROM item_revision WHERE id = %s ORDER BY _id;", (item_id,))
+        revision_ids = [row["_id"] for row in cursor.fetchall()]
+        for revision_id, value in zip(revision_ids, datetimes, strict=True):
+            cursor.execute(
+                "UPDATE item_revision SET _datetime = %s WHERE _id = %s;", (value, revision_id)
+            )
+    get_db_connection().commit()
+
+
+def delete_all_item_revisions():
+    with get_db_connection().cursor() as cursor:
+        cursor.execute("DELETE FROM item_revision;")
+    get_db_connection().commit()
+
+
+class TestItemsAsOf:
+    @staticmethod
+    def test_replays_revisions(app, new_user, new_item):
+        with app.app_context():
+            user_id = new_user()
+            item_1_id = new_item(user_id, "item1", quantity=1)
+            update_item_quantity_by_id(user_id, item_1_id, 1)
+            set_revision_datetimes(item_1_id, datetime(2020, 1, 1), datetime(2020, 2, 1))
+            item_2_id = new_item(user_id, "item2")
+            update_item_deletion_flag_by_id(user_id, item_2_id)
+            set_revision_datetimes(item_2_id, datetime(2020, 1, 2), datetime(2020, 2, 2))
+
+            assert get_all_items_as_of_page(datetime(2019, 12, 31)).items == []
+            page = get_all_items_as_of_page(datetime(2020, 1, 15))
+            assert [(item.id, item.quantity) for item in page.items] == [
+                (item_1_id, 1),
+                (item_2_id, 0),
+            ]
+            # at or before, so a revision written exactly at as_of counts
+            page = get_all_items_as_of_page(datetime(2020, 2, 1))
+            assert [(item.id, item.quantity) for item in page.items] == [
+                (item_1_id, 2),
+                (item_2_id, 0),
+            ]
+            page = get_all_items_as_of_page(datetime(2020, 3, 1))
+            assert [item.id for item in page.items] == [item_1_id]
+
+    @staticmethod
+    def test_pages(app, new_user, new_item):
+        with app.app_context():
+            user_id = new_user()
+            item_ids = [new_item(user_id, f"item{index}") for index in range(3)]
+            as_of = datetime(9999, 1, 1)
+            page = get_all_items_as_of_page(as_of, 0, 2)
+            assert [item.id for item in page.items] == item_ids[:2]
+            assert page.next_cursor == item_ids[1]
+            page = get_all_items_as_of_page(as_of, page.next_cursor, 2)
+            assert [item.id for item in page.items] == item_ids[2:]
+            assert page.next_cursor is None
+
+    @staticmethod
+    def test_snapshot(app, monkeypatch, new_user, new_item):
+        monkeypatch.setitem(app.config, "CHANGES_SETTLE_SECONDS", 0)
+        with app.app_context():
+            user_id = new_user()
+            item_id = new_item(user_id, "item", quantity=1)
+            update_item_quantity_by_id(user_id, item_id, 1)
+            deleted_id = new_item(user_id, "deleted")
+            update_item_deletion_flag_by_id(user_id, deleted_id)
+            set_revision_datetimes(item_id, datetime(2020, 1, 1), datetime(2020, 2, 1))
+            set_revision_datetimes(deleted_id, datetime(2020, 1, 1), datetime(2020, 2, 1))
+            snapshot = create_item_snapshot()
+
+            # the checkpoint alone answers, and builds the next checkpoint
+            delete_all_item_revisions()
+            page = get_all_items_as_of_page(snapshot.taken_at)
+            assert [(item.id, item.quantity) for item in page.items] == [(item_id, 2)]
+            create_item_snapshot()
+
+            update_item_quantity_by_id(user_id, item_id, 1)
+            set_revision_datetimes(item_id, datetime(9998, 1, 1))
+            page = get_all_items_as_of_page(datetime(9999, 1, 1))
+            assert [(item.id, item.quantity) for item in page.items] == [(item_id, 3)]
+            page = get_all_items_as_of_page(snapshot.taken_at)
+            assert [(item.id, item.quantity) for item in page.items] == [(item_id, 2)]
+
+    @staticmethod
+    def test_hard_deleted(app, monkeypatch, new_user, new_item):
+        monkeypatch.setitem(app.config, "CHANGES_SETTLE_SECONDS", 0)
+        with app.app_context():
+            user_id = new_user()
+            item_id = new_item(user_id)
+            set_revision_datetimes(item_id, datetime(2020, 1, 1))
+            snapshot = create_item_snapshot()
+            with get_db_connection().cursor() as cursor:
+                cursor.execute(
+                    "UPDATE item_snapshot SET taken_at = %s WHERE id = %s;",
+                    (datetime(2020, 2, 1), snapshot.id),
+                )
+            get_db_connection().commit()
+
+            delete_item_by_id(item_id)
+            # the checkpoint still holds the item, the tombstone written since ends it
+            assert get_all_items_as_of_page(datetime(2020, 2, 1)).items[0].id == item_id
+            assert get_all_items_as_of_page(datetime(9999, 1, 1)).items == []
+            create_item_snapshot()
+            assert get_all_items_as_of_page(datetime(9999, 1, 1)).items == []
+
+
+def test_snapshot_command(app, cli_runner, new_user, new_item):
+    with app.app_context():
+        new_item(new_user())
+    result = cli_runner.invoke(args="item snapshot")
+    assert result.exit_code == 0
+    assert "Snapshot" in result.output
@@ -1,6 +1,20 @@
+from unittest.mock import patch
+
 import pytest
+from flask import g
 
-from app.models.model import _call_commit, _call_fetchall, _call_fetchone, query
+from app.models.model import (
+    QUERY_DURATION,
+    QUERY_ERRORS,
+    QUERY_ROWS,
+    _call_commit,
+    _call_commit_many,
+    _call_fetchall,
+    _call_fetchone,
+    _call_stream,
+    _written_table,
+    query,
+)
 
 
 class TestQueryDecorator:
@@ -9,6 +23,8 @@ class TestQueryDecorator:
         (
             ("get_testfunc", _call_fetchone),
             ("get_all_testfunc", _call_fetchall),
+            ("stream_testfunc", _call_stream),
+            ("create_many_testfunc", _call_commit_many),
             ("create_testfunc", _call_commit),
             ("update_testfunc", _call_commit),
             ("delete_testfunc", _call_commit),
@@ -17,7 +33,8 @@ class TestQueryDecorator:
     @staticmethod
     def test_all_good(app, function_name, expected_func):
         def standin(fire):
-            assert fire.func is expected_func
+            # writes come wrapped in retrying
+            assert getattr(fire.func, "__wrapped__", fire.func) is expected_func
             assert fire.args[0] == "TESTING"
 
         standin.__name__ = function_name
@@ -40,3 +57,112 @@ class TestQueryDecorator:
             @query
             def testfunc(fire):
                 pass # pragma: no cover
+
+
+@pytest.mark.parametrize(
+    "query_str, expected",
+    (
+        ("INSERT INTO item (name) VALUES (%s);", "item"),
+        ("INSERT IGNORE INTO item_tag (name) VALUES (%s);", "item_tag"),
+        ("UPDATE item SET name = %s;", "item"),
+        ("DELETE FROM `item_comment` WHERE id = %s;", "item_comment"),
+        ("SELECT * FROM item;", None),
+    ),
+)
+def test_written_table(query_str, expected):
+    assert _written_table(query_str) == expected
+
+
+class TestInstrumentation:
+    @staticmethod
+    def test_records_rows_and_duration(app):
+        with app.app_context(), patch("app.models.model.get_db_connection") as mock_conn:
+            cursor = mock_conn.return_value.cursor.return_value.__enter__.return_value
+            cursor.fetchall.return_value = [{"id": 1}, {"id": 2}]
+            count = QUERY_DURATION.get_count(query="instrumented")
+            rows = QUERY_ROWS.get(query="instrumented")
+            _call_fetchall("TESTING", query_name="instrumented")
+            assert QUERY_DURATION.get_count(query="instrumented") == count + 1
+            assert QUERY_ROWS.get(query="instrumented") == rows + 2
+
+    @staticmethod
+    def test_records_streamed_rows(app):
+        with app.app_context(), patch("app.models.model.get_db_connection") as mock_conn:
+            cursor = mock_conn.return_value.cursor.return_value.__enter__.return_value
+            cursor.fetchall_unbuffered.return_value = iter([{"id": 1}, {"id": 2}, {"id": 3}])
+            count = QUERY_DURATION.get_count(query="streamed")
+            rows = QUERY_ROWS.get(query="streamed")
+            stream = _call_stream("TESTING", query_name="streamed")
+            assert next(stream) == {"id": 1}
+            assert QUERY_DURATION.get_count(query="streamed") == count + 1
+            assert list(stream) == [{"id": 2}, {"id": 3}]
+            assert QUERY_DURATION.get_count(query="streamed") == count + 1
+            assert QUERY_ROWS.get(query="streamed") == rows + 3
+
+    @staticmethod
+    def test_stream_timed_to_first_row(app, caplog):
+        app.config["SLOW_QUERY_THRESHOLD"] = 1
+        with (
+            app.app_context(),
+            patch("app.models.model.get_db_connection") as mock_conn,
+            patch("app.models.model.time.perf_counter", side_effect=[0, 0.5]),
+        ):
+            cursor = mock_conn.return_value.cursor.return_value.__enter__.return_value
+            cursor.fetchall_unbuffered.return_value = iter([{"id": 1}, {"id": 2}])
+            # a slow consumer would make any further perf_counter call raise StopIteration
+            assert list(_call_stream("TESTING", query_name="slow_consumer")) == [
+                {"id": 1},
+                {"id": 2},
+            ]
+        assert "Slow query" not in caplog.text
+
+    @staticmethod
+    def test_records_errors(app):
+        with app.app_context(), patch("app.models.model.get_db_connection") as mock_conn:
+            cursor = mock_conn.return_value.cursor.return_value.__enter__.return_value
+            cursor.execute.side_effect = RuntimeError("Induced failure.")
+            errors = QUERY_ERRORS.get(query="failing")
+            with pytest.raises(RuntimeError):
+                _call_fetchone("TESTING", query_name="failing")
+            assert QUERY_ERRORS.get(query="failing") == errors + 1
+
+
+class TestSlowQueryLog:
+    @staticmethod
+    @pytest.mark.parametrize("log_parameters", (True, False))
+    def test_logged(app, monkeypatch, caplog, log_parameters):
+        monkeypatch.setitem(app.config, "SLOW_QUERY_THRESHOLD", 0)
+        monkeypatch.setitem(app.config, "SLOW_QUERY_LOG_PARAMETERS", log_parameters)
+        with app.app_context(), patch("app.models.model.get_db_connection"):
+            _call_fetchone("SELECT %s;", "secret", query_name="slow")
+        assert "Slow query slow" in caplog.text
+        assert ("secret" in caplog.text) is log_parameters
+
+    @staticmethod
+    def test_explain(app, monkeypatch, caplog):
+        monkeypatch.setitem(app.config, "SLOW_QUERY_THRESHOLD", 0)
+        monkeypatch.setitem(app.config, "SLOW_QUERY_EXPLAIN", True)
+        with app.app_context(), patch("app.models.model.get_db_connection") as mock_conn:
+            cursor = mock_conn.return_value.cursor.return_value.__enter__.return_value
+            cursor.fetchall.return_value = [{"type": "ALL"}]
+            _call_fetchall("SELECT * FROM item WHERE id = %s;", 1, query_name="slow")
+            cursor.execute.assert_called_with("EXPLAIN SELECT * FROM item WHERE id = %s;", (1,))
+        assert "'type': 'ALL'" in caplog.text
+
+    @staticmethod
+    def test_not_explained_for_inserts(app, monkeypatch):
+        monkeypatch.setitem(app.config, "SLOW_QUERY_THRESHOLD", 0)
+        monkeypatch.setitem(app.config, "SLOW_QUERY_EXPLAIN", True)
+        with app.app_context(), patch("app.models.model.get_db_connection") as mock_conn:
+            cursor = mock_conn.return_value.cursor.return_value.__enter__.return_value
+            cursor.rowcount = 1
+            g.in_transaction = False
+            _call_commit("INSERT INTO item (name) VALUES (%s);", "name", query_name="slow")
+            assert cursor.execute.call_count == 1
+
+    @staticmethod
+    def test_under_threshold(app, monkeypatch, caplog):
+        monkeypatch.setitem(app.config, "SLOW_QUERY_THRESHOLD", 60)
+        with app.app_context(), patch("app.models.model.get_db_connection"):
+            _call_fetchone("SELECT 1;", query_name="fast")
+        assert "Slow query" not in caplog.text
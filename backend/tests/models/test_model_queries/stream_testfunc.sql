@@ -0,0 +1 @@
+TESTING
@@ -0,0 +1,158 @@
+from datetime import datetime
+
+import pytest
+
+from app.db import get_db_connection
+from app.models.item import (
+    get_all_item_comment_revisions_by_origin_id,
+    get_all_item_revisions_by_origin_id,
+    get_all_items_as_of_page,
+    get_item_validator,
+    get_joined_item_by_id,
+    update_item_comment_by_id,
+    update_item_quantity_by_id,
+)
+from app.models.revision import archive_item_comment_revisions, archive_item_revisions
+
+OLD = datetime(2020, 1, 1)
+CUTOFF = datetime(2021, 1, 1)
+
+
+@pytest.fixture(autouse=True)
+def clean(truncate_all):
+    pass
+
+
+def backdate(table, revision_ids):
+    with get_db_connection().cursor() as cursor:
+        cursor.execute(f"UPDATE {table} SET _datetime = %s WHERE _id IN %s;", (OLD, revision_ids))
+    get_db_connection().commit()
+
+
+def count_archived(table):
+    with get_db_connection().cursor() as cursor:
+        cursor.execute(f"SELECT COUNT(*) AS count FROM {table};")
+        return cursor.fetchone()["count"]
+
+
+class TestArchiveItemRevisions:
+    @staticmethod
+    def test_keeps_latest(app, new_user, new_item):
+        with app.app_context():
+            user_id = new_user()
+            item_id = new_item(user_id, quantity=1)
+            for _ in range(3):
+                update_item_quantity_by_id(user_id, item_id, 1)
+            revisions = get_all_item_revisions_by_origin_id(item_id)
+            backdate("item_revision", tuple(revision._id for revision in revisions))
+
+            assert list(archive_item_revisions(CUTOFF)) == [3]
+            (latest,) = get_all_item_revisions_by_origin_id(item_id)
+            assert latest._id == revisions[-1]._id
+            assert count_archived("item_revision_archive") == 3
+            assert get_joined_item_by_id(item_id).has_revisions
+
+            # nothing left to move on a second run
+            assert list(archive_item_revisions(CUTOFF)) == []
+
+    @staticmethod
+    def test_older_than(app, new_user, new_item):
+        with app.app_context():
+            user_id = new_user()
+            item_id = new_item(user_id)
+            for _ in range(2):
+                update_item_quantity_by_id(user_id, item_id, 1)
+            revisions = get_all_item_revisions_by_origin_id(item_id)
+            backdate("item_revision", (revisions[0]._id,))
+
+            assert list(archive_item_revisions(CUTOFF)) == [1]
+            assert len(get_all_item_revisions_by_origin_id(item_id)) == 2
+
+    @staticmethod
+    def test_batches(app, new_user, new_item):
+        with app.app_context():
+            user_id = new_user()
+            revision_ids = []
+            for index in range(3):
+                item_id = new_item(user_id, f"item{index}")
+                update_item_quantity_by_id(user_id, item_id, 1)
+                revision_ids.extend(
+                    revision._id for revision in get_all_item_revisions_by_origin_id(item_id)
+                )
+            backdate("item_revision", tuple(revision_ids))
+
+            assert list(archive_item_revisions(CUTOFF, batch_size=2)) == [2, 1]
+
+    @staticmethod
+    def test_as_of_unchanged(app, new_user, new_item):
+        with app.app_context():
+            user_id = new_user()
+            item_id = new_item(user_id, quantity=1)
+            update_item_quantity_by_id(user_id, item_id, 1)
+            revisions = get_all_item_revisions_by_origin_id(item_id)
+            backdate("item_revision", (revisions[0]._id,))
+            (item,) = get_all_items_as_of_page(CUTOFF).items
+            assert item.quantity == 1
+
+            list(archive_item_revisions(CUTOFF))
+            (item,) = get_all_items_as_of_page(CUTOFF).items
+            assert item.quantity == 1
+
+
+def test_archive_item_comment_revisions(app, new_user, new_item, new_item_comment):
+    with app.app_context():
+        user_id = new_user()
+        comment_id = new_item_comment(user_id, new_item(user_id))
+        update_item_comment_by_id(user_id, comment_id, "edited")
+        revisions = get_all_item_comment_revisions_by_origin_id(comment_id)
+        backdate("item_comment_revision", tuple(revision._id for revision in revisions))
+
+        assert list(archive_item_comment_revisions(CUTOFF)) == [1]
+        (latest,) = get_all_item_comment_revisions_by_origin_id(comment_id)
+        assert latest.text == "edited"
+        assert count_archived("item_comment_revision_archive") == 1
+
+
+def test_archive_command(app, cli_runner, new_user, new_item):
+    with app.app_context():
+        user_id = new_user()
+        item_id = new_item(user_id)
+        update_item_quantity_by_id(user_id, item_id, 1)
+        revisions = get_all_item_revisions_by_origin_id(item_id)
+        backdate("item_revision", tuple(revision._id for revision in revisions))
+    result = cli_runner.invoke(args="revisions archive --older-than 30 --batch-size 10")
+    assert result.exit_code == 0
+    assert "Archived 1 item revisions." in result.output
+    assert "Archived 0 item comment revisions." in result.output
+
+
+def test_backfill_after_archive(app, cli_runner, new_user, new_item, new_item_comment):
+    with app.app_context():
+        user_id = new_user()
+        item_id = new_item(user_id)
+        comment_id = new_item_comment(user_id, item_id)
+        update_item_quantity_by_id(user_id, item_id, 1)
+        update_item_comment_by_id(user_id, comment_id, "edited")
+        backdate(
+            "item_revision",
+            tuple(revision._id for revision in get_all_item_revisions_by_origin_id(item_id)),
+        )
+        backdate(
+            "item_comment_revision",
+            tuple(
+                revision._id for revision in get_all_item_comment_revisions_by_origin_id(comment_id)
+            ),
+        )
+        list(archive_item_revisions(CUTOFF))
+        list(archive_item_comment_revisions(CUTOFF))
+        validator = get_item_validator(item_id)
+
+    result = cli_runner.invoke(args="item backfill-revision-counts")
+    assert result.exception is None
+
+    with app.app_context():
+        # archived revisions still count, so versions and has_revisions stay put
+        assert get_item_validator(item_id) == validator
+        item = get_joined_item_by_id(item_id)
+        assert item.has_revisions
+        assert item.comments[0].has_revisions
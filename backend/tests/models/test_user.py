@@ -1,8 +1,17 @@
+import time
+from unittest.mock import patch
+
 import pytest
 from pydantic_core import ValidationError
 from pymysql.err import IntegrityError
 
-from app.models.user import get_all_users, get_user_by_id, get_user_by_name
+from app.models.user import (
+    LastLoginBuffer,
+    get_all_users,
+    get_user_by_id,
+    get_user_by_name,
+    update_many_user_last_logins,
+)
 
 
 @pytest.fixture(autouse=True)
@@ -57,6 +66,17 @@ class TestUserCliCommands:
         result = cli_runner.invoke(args=f"user delete {username}")
         assert result.exception is None
 
+    @staticmethod
+    def test_calibrate_hash(cli_runner):
+        result = cli_runner.invoke(
+            args="user calibrate-hash --target 60 --memory-cost 8 --parallelism 1 "
+            "--max-time-cost 2 --samples 1"
+        )
+        assert result.exit_code == 0
+        assert "PASSWORD_HASH_TIME_COST = 2" in result.output
+        assert "PASSWORD_HASH_MEMORY_COST = 8" in result.output
+        assert "PASSWORD_HASH_PARALLELISM = 1" in result.output
+
 
 class TestGetUserById:
     @staticmethod
@@ -108,3 +128,52 @@ def test_get_all_users(app, new_user):
 
     with app.app_context():
         assert len(get_all_users()) == num_users
+
+
+class TestLastLoginBuffer:
+    @staticmethod
+    def test_flush(app, new_user):
+        user_id = new_user()
+        other_user_id = new_user("other")
+        buffer = LastLoginBuffer(app, interval=3600)
+        with app.app_context():
+            buffer.record(user_id)
+            buffer.record(user_id)
+            assert get_user_by_id(user_id).last_login is None
+
+        buffer.flush()
+        # flushed on another connection, a fresh context reads past the earlier snapshot
+        with app.app_context():
+            assert get_user_by_id(user_id).last_login
+            assert get_user_by_id(other_user_id).last_login is None
+        buffer.close()
+
+    @staticmethod
+    def test_close_flushes(app, new_user):
+        user_id = new_user()
+        buffer = LastLoginBuffer(app, interval=3600)
+        with app.app_context():
+            buffer.record(user_id)
+        buffer.close()
+        with app.app_context():
+            assert get_user_by_id(user_id).last_login
+
+    @staticmethod
+    def test_failed_flush_kept(app):
+        buffer = LastLoginBuffer(app, interval=3600)
+        with patch("app.models.user.update_many_user_last_logins", side_effect=RuntimeError):
+            buffer.record(1)
+            buffer.flush()
+        with patch("app.models.user.update_many_user_last_logins") as update:
+            buffer.close()
+        ((logins,), _) = update.call_args
+        assert set(logins) == {1}
+
+    @staticmethod
+    def test_never_moves_backwards(app, new_user):
+        user_id = new_user()
+        with app.app_context():
+            update_many_user_last_logins({user_id: time.time()})
+            latest = get_user_by_id(user_id).last_login
+            update_many_user_last_logins({user_id: time.time() - 3600})
+            assert get_user_by_id(user_id).last_login == latest
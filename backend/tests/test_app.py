@@ -1,7 +1,65 @@
 from http import HTTPStatus
+from unittest.mock import MagicMock, patch
+
+from flask import g
+from flask.sessions import SecureCookieSessionInterface
+from werkzeug.routing import MapAdapter
 
 
 def test_heartbeat(client):
     response = client.get("/heartbeat")
     assert response.status_code == HTTPStatus.OK
     assert b"" == response.data
+
+
+def test_metrics(client):
+    client.get("/heartbeat")
+    response = client.get("/metrics")
+    assert response.status_code == HTTPStatus.OK
+    assert response.mimetype == "text/plain"
+    assert b"# TYPE db_query_duration_seconds histogram" in response.data
+
+
+def test_session_free(client):
+    with patch.object(
+        SecureCookieSessionInterface,
+        "open_session",
+        autospec=True,
+        side_effect=SecureCookieSessionInterface.open_session,
+    ) as open_session:
+        client.get("/heartbeat")
+        client.options("/auth/login")
+        assert not open_session.called
+        client.post("/auth/logout")
+        assert open_session.called
+
+
+def test_lazy_globals(app):
+    loader = MagicMock(return_value={"id": 1})
+    with patch.dict(app.lazy_globals, user=loader), app.test_request_context():
+        assert not loader.called
+        assert g.user == {"id": 1}
+        assert g.user == {"id": 1}
+        assert loader.call_count == 1
+
+
+def test_lazy_globals_get_and_contains(app):
+    loader = MagicMock(return_value={"id": 1})
+    with patch.dict(app.lazy_globals, user=loader), app.test_request_context():
+        assert "user" in g
+        assert g.get("user") == {"id": 1}
+        assert g.get("missing", 2) == 2
+        assert "missing" not in g
+        assert loader.call_count == 1
+
+
+def test_url_matched_once(client):
+    with patch.object(MapAdapter, "match", autospec=True, side_effect=MapAdapter.match) as match:
+        client.get("/heartbeat")
+        client.get("/items/")
+    assert match.call_count == 2
+
+
+def test_user_loaded_from_session(app):
+    with app.test_request_context():
+        assert g.user is None
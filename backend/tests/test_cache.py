@@ -0,0 +1,102 @@
+from http import HTTPStatus
+from unittest.mock import patch
+
+import pytest
+
+from app.cache import ResponseCache
+from app.db import transaction
+from app.models.item import update_item_by_id
+
+
+@pytest.fixture(autouse=True)
+def clean(truncate_all):
+    pass
+
+
+class TestResponseCache:
+    @staticmethod
+    def test_lru_eviction():
+        cache = ResponseCache(max_bytes=10)
+        cache.set("a", b"aaaa", cache.generation)
+        cache.set("b", b"bbbb", cache.generation)
+        assert cache.get("a") == b"aaaa"
+        cache.set("c", b"cccc", cache.generation)
+        assert cache.get("b") is None
+        assert cache.get("a") == b"aaaa"
+        assert cache.get("c") == b"cccc"
+        assert cache.size == 8
+
+    @staticmethod
+    def test_oversized_entry_skipped():
+        cache = ResponseCache(max_bytes=2)
+        cache.set("a", b"aaa", cache.generation)
+        assert cache.get("a") is None
+        assert cache.size == 0
+
+    @staticmethod
+    def test_stale_generation_dropped():
+        cache = ResponseCache(max_bytes=10)
+        generation = cache.generation
+        cache.invalidate()
+        cache.set("a", b"a", generation)
+        assert cache.get("a") is None
+
+    @staticmethod
+    def test_only_cached_tables_invalidate():
+        cache = ResponseCache(max_bytes=10)
+        cache.set("a", b"a", cache.generation)
+        cache.table_written("user")
+        assert cache.get("a") == b"a"
+        cache.table_written("item_comment")
+        assert cache.get("a") is None
+
+
+class TestCachedEndpoints:
+    @staticmethod
+    def test_hit(app, client, new_authenticated_user, new_item):
+        with client:
+            user_id = new_authenticated_user(client)
+            item_id = new_item(user_id)
+            first = client.get(f"/items/{item_id}")
+            with patch("app.blueprints.item.get_joined_item_by_id") as mock_func:
+                second = client.get(f"/items/{item_id}")
+                mock_func.assert_not_called()
+            assert first.status_code == second.status_code == HTTPStatus.OK
+            assert first.data == second.data
+
+    @staticmethod
+    def test_invalidated_after_commit(app, client, new_authenticated_user, new_item):
+        with client:
+            user_id = new_authenticated_user(client)
+            item_id = new_item(user_id)
+            assert client.get(f"/items/{item_id}").json["quantity"] == 0
+            with app.app_context():
+                with transaction():
+                    update_item_by_id(user_id, item_id, "item", None, 5, None)
+                    # not yet committed, the cached entry must survive
+                    assert app.extensions["response_cache"].size
+            assert client.get(f"/items/{item_id}").json["quantity"] == 5
+
+    @staticmethod
+    def test_not_invalidated_after_rollback(app, client, new_authenticated_user, new_item):
+        cache = app.extensions["response_cache"]
+        with client:
+            user_id = new_authenticated_user(client)
+            item_id = new_item(user_id)
+            client.get(f"/items/{item_id}")
+            generation = cache.generation
+            with app.app_context(), pytest.raises(RuntimeError):
+                with transaction():
+                    update_item_by_id(user_id, item_id, "item", None, 5, None)
+                    raise RuntimeError("Induced failure.")
+            assert cache.generation == generation
+            assert client.get(f"/items/{item_id}").json["quantity"] == 0
+
+    @staticmethod
+    def test_list_invalidated_by_comment(app, client, new_authenticated_user, new_item):
+        with client:
+            user_id = new_authenticated_user(client)
+            item_id = new_item(user_id)
+            assert not client.get("/items/").json["items"][0]["comments"]
+            client.post(f"/items/{item_id}/comments/", data={"text": "foo"})
+            assert client.get("/items/").json["items"][0]["comments"]
@@ -0,0 +1,258 @@
+import threading
+import time
+from unittest.mock import MagicMock, patch
+
+import pymysql
+import pytest
+
+from app.db import (
+    TRANSACTION_RETRIES,
+    ConnectionPool,
+    PoolExhaustedError,
+    get_applied_migration_versions,
+    get_db_connection,
+    get_migrations,
+    retrying,
+    transaction,
+)
+
+
+def make_pool(**kwargs):
+    return ConnectionPool(MagicMock, **kwargs)
+
+
+class TestConnectionPool:
+    @staticmethod
+    def test_reuses_released_connection():
+        pool = make_pool()
+        conn = pool.acquire()
+        pool.release(conn)
+        assert pool.acquire() is conn
+        conn.rollback.assert_called_once()
+        conn.ping.assert_called_once()
+
+    @staticmethod
+    def test_exhausted():
+        pool = make_pool(max_size=1, timeout=0)
+        pool.acquire()
+        with pytest.raises(PoolExhaustedError):
+            pool.acquire()
+
+    @staticmethod
+    def test_release_wakes_waiter():
+        pool = make_pool(max_size=1, timeout=5)
+        conn = pool.acquire()
+        timer = threading.Timer(0.05, pool.release, (conn,))
+        timer.start()
+        assert pool.acquire() is conn
+        timer.join()
+        assert pool.size == 1
+
+    @staticmethod
+    @pytest.mark.parametrize("discard", (False, True))
+    def test_release_holds_slot(discard):
+        opened = []
+        closed = []
+        live = []
+
+        def connect():
+            opened.append(MagicMock())
+            return opened[-1]
+
+        pool = ConnectionPool(connect, max_size=1, timeout=5)
+        conn = pool.acquire()
+
+        def slow_release():
+            # the waiter is blocked by now, give it the chance to slip into the gap
+            time.sleep(0.05)
+            live.append(len(opened) - len(closed))
+
+        conn.rollback.side_effect = slow_release
+        conn.close.side_effect = lambda: (slow_release(), closed.append(conn))
+        timer = threading.Timer(0.05, pool.release, (conn, discard))
+        timer.start()
+        pool.acquire()
+        timer.join()
+        live.append(len(opened) - len(closed))
+        assert max(live) <= pool.max_size
+        assert pool.size <= pool.max_size
+
+    @staticmethod
+    def test_dead_connection_replaced():
+        pool = make_pool()
+        conn = pool.acquire()
+        conn.ping.side_effect = pymysql.err.OperationalError
+        pool.release(conn)
+        new_conn = pool.acquire()
+        assert new_conn is not conn
+        conn.close.assert_called_once()
+
+    @staticmethod
+    def test_discard():
+        pool = make_pool()
+        conn = pool.acquire()
+        pool.release(conn, discard=True)
+        conn.close.assert_called_once()
+        assert pool.size == 0
+
+    @staticmethod
+    def test_max_lifetime():
+        pool = make_pool(max_lifetime=10)
+        with patch("app.db.time.monotonic", return_value=0):
+            conn = pool.acquire()
+        with patch("app.db.time.monotonic", return_value=10):
+            pool.release(conn)
+        conn.close.assert_called_once()
+        assert pool.size == 0
+
+    @staticmethod
+    def test_idle_timeout_respects_min_size():
+        pool = make_pool(min_size=1, idle_timeout=10)
+        with patch("app.db.time.monotonic", return_value=0):
+            first = pool.acquire()
+            second = pool.acquire()
+            pool.release(first)
+            pool.release(second)
+        with patch("app.db.time.monotonic", return_value=10):
+            assert pool.acquire() is second
+        first.close.assert_called_once()
+        second.close.assert_not_called()
+
+
+def test_connection_returned_to_pool(app):
+    with app.app_context():
+        conn = get_db_connection()
+    with app.app_context():
+        assert get_db_connection() is conn
+
+
+def test_connection_discarded_mid_transaction(app):
+    with app.app_context():
+        conn = get_db_connection()
+        context = transaction()
+        context.__enter__()
+    with app.app_context():
+        assert get_db_connection() is not conn
+
+
+def flaky(*errors, result="done"):
+    # raises the given errors in order, then returns
+    calls = []
+
+    @retrying
+    def func():
+        calls.append(None)
+        if len(calls) <= len(errors):
+            raise errors[len(calls) - 1]
+        return result
+
+    return func, calls
+
+
+DEADLOCK = pymysql.OperationalError(1213, "Deadlock found when trying to get lock")
+LOCK_WAIT_TIMEOUT = pymysql.OperationalError(1205, "Lock wait timeout exceeded")
+
+
+class TestRetrying:
+    @staticmethod
+    def test_off_by_default(app):
+        func, calls = flaky(DEADLOCK)
+        with app.app_context(), pytest.raises(pymysql.OperationalError):
+            func()
+        assert len(calls) == 1
+
+    @staticmethod
+    def test_retries_transient_errors(app):
+        func, calls = flaky(DEADLOCK, LOCK_WAIT_TIMEOUT)
+        deadlocks = TRANSACTION_RETRIES.get(reason="deadlock")
+        with (
+            app.app_context(),
+            patch.dict(app.config, TRANSACTION_RETRY_ATTEMPTS=2),
+            patch("app.db.time.sleep") as sleep,
+        ):
+            assert func() == "done"
+        assert len(calls) == 3
+        assert sleep.call_count == 2
+        for (delay,), _ in sleep.call_args_list:
+            assert 0 <= delay <= app.config["TRANSACTION_RETRY_MAX_DELAY"]
+        assert TRANSACTION_RETRIES.get(reason="deadlock") == deadlocks + 1
+
+    @staticmethod
+    def test_attempts_bounded(app):
+        func, calls = flaky(DEADLOCK, DEADLOCK, DEADLOCK)
+        with (
+            app.app_context(),
+            patch.dict(app.config, TRANSACTION_RETRY_ATTEMPTS=1),
+            patch("app.db.time.sleep"),
+            pytest.raises(pymysql.OperationalError),
+        ):
+            func()
+        assert len(calls) == 2
+
+    @staticmethod
+    def test_other_errors_not_retried(app):
+        func, calls = flaky(pymysql.OperationalError(2013, "Lost connection"))
+        with (
+            app.app_context(),
+            patch.dict(app.config, TRANSACTION_RETRY_ATTEMPTS=2),
+            pytest.raises(pymysql.OperationalError),
+        ):
+            func()
+        assert len(calls) == 1
+
+    @staticmethod
+    def test_nested_calls_leave_retry_to_outermost(app):
+        inner, inner_calls = flaky(DEADLOCK, DEADLOCK)
+
+        @retrying
+        def outer():
+            return inner()
+
+        with (
+            app.app_context(),
+            patch.dict(app.config, TRANSACTION_RETRY_ATTEMPTS=2),
+            patch("app.db.time.sleep"),
+        ):
+            assert outer() == "done"
+        # each failure propagated to the outer call instead of being retried twice over
+        assert len(inner_calls) == 3
+
+
+class TestMigrations:
+    @staticmethod
+    def test_status_after_init(app, cli_runner):
+        with app.app_context():
+            migrations = get_migrations()
+        result = cli_runner.invoke(args="db status")
+        assert result.exception is None
+        lines = result.output.splitlines()
+        assert len(lines) == len(migrations)
+        assert all(line.endswith("applied") for line in lines)
+
+    @staticmethod
+    def test_migrate_nothing_pending(cli_runner):
+        result = cli_runner.invoke(args="db migrate")
+        assert result.exception is None
+        assert result.output == "Done.\n"
+
+    @staticmethod
+    def test_migrations_are_rerunnable(app, cli_runner):
+        with app.app_context():
+            conn = get_db_connection()
+            with conn.cursor() as cursor:
+                cursor.execute("DELETE FROM schema_migration")
+            conn.commit()
+        result = cli_runner.invoke(args="db status")
+        assert all(line.endswith("pending") for line in result.output.splitlines())
+        result = cli_runner.invoke(args="db migrate")
+        assert result.exception is None
+        with app.app_context():
+            assert get_applied_migration_versions() == {
+                migration.version for migration in get_migrations()
+            }
+
+    @staticmethod
+    def test_migration_files_ordered(app):
+        with app.app_context():
+            versions = [migration.version for migration in get_migrations()]
+        assert versions == sorted(set(versions))
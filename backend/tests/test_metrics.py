@@ -0,0 +1,50 @@
+import pytest
+
+from app.metrics import Registry
+
+
+def test_counter():
+    registry = Registry()
+    counter = registry.counter("things_total", "Things.", ("kind",))
+    counter.inc(kind="a")
+    counter.inc(2, kind="a")
+    counter.inc(kind='b"')
+    assert counter.get(kind="a") == 3
+    assert registry.render() == (
+        "# HELP things_total Things.\n"
+        "# TYPE things_total counter\n"
+        'things_total{kind="a"} 3\n'
+        'things_total{kind="b\\""} 1\n'
+    )
+
+
+def test_histogram():
+    registry = Registry()
+    histogram = registry.histogram("latency_seconds", "Latency.", buckets=(0.1, 1))
+    histogram.observe(0.05)
+    histogram.observe(0.1)
+    histogram.observe(5)
+    assert histogram.get_count() == 3
+    assert registry.render() == (
+        "# HELP latency_seconds Latency.\n"
+        "# TYPE latency_seconds histogram\n"
+        'latency_seconds_bucket{le="0.1"} 2\n'
+        'latency_seconds_bucket{le="1.0"} 2\n'
+        'latency_seconds_bucket{le="+Inf"} 3\n'
+        "latency_seconds_sum 5.15\n"
+        "latency_seconds_count 3\n"
+    )
+
+
+def test_wrong_labels():
+    registry = Registry()
+    counter = registry.counter("things_total", "Things.", ("kind",))
+    with pytest.raises(ValueError):
+        counter.inc(other="a")
+
+
+def test_duplicate_registration():
+    registry = Registry()
+    registry.counter("things_total", "Things.")
+    with pytest.raises(ValueError):
+        registry.counter("things_total", "Things.")
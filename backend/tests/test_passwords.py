@@ -0,0 +1,93 @@
+import threading
+
+import pytest
+from argon2 import PasswordHasher
+from argon2.exceptions import VerifyMismatchError
+from flask import Flask
+
+from app import passwords
+from app.passwords import (
+    PASSWORD_HASH_REJECTIONS,
+    HashBenchmark,
+    HasherBusyError,
+    HasherPool,
+    HashParameters,
+    calibrate_hash_parameters,
+    recommend_hash_parameters,
+)
+
+# cheap parameters, these tests are about the pool and not argon2
+FAST_HASHER = PasswordHasher(time_cost=1, memory_cost=8, parallelism=1)
+
+
+def test_hash_and_verify():
+    pool = HasherPool(FAST_HASHER, workers=1, max_pending=0)
+    password_hash = pool.hash("password")
+    assert pool.verify(password_hash, "password")
+    with pytest.raises(VerifyMismatchError):
+        pool.verify(password_hash, "wrong")
+    assert not pool.check_needs_rehash(password_hash)
+
+
+class BlockingHasher:
+    def __init__(self):
+        self.started = threading.Semaphore(0)
+        self.release = threading.Event()
+
+    def hash(self, password):
+        self.started.release()
+        self.release.wait()
+        return password
+
+
+def test_saturated():
+    hasher = BlockingHasher()
+    pool = HasherPool(hasher, workers=1, max_pending=0)
+    results = []
+    thread = threading.Thread(target=lambda: results.append(pool.hash("password")))
+    thread.start()
+    # the running call holds the only slot
+    hasher.started.acquire()
+    rejections = PASSWORD_HASH_REJECTIONS.get(operation="hash")
+    with pytest.raises(HasherBusyError):
+        pool.hash("password")
+    assert PASSWORD_HASH_REJECTIONS.get(operation="hash") == rejections + 1
+
+    hasher.release.set()
+    thread.join()
+    assert results == ["password"]
+    # the slot is handed back once the call finishes
+    assert pool.hash("password") == "password"
+
+
+def test_parameters_from_config():
+    app = Flask("test")
+    app.config.update(
+        PASSWORD_HASH_TIME_COST=1, PASSWORD_HASH_MEMORY_COST=8, PASSWORD_HASH_PARALLELISM=1
+    )
+    passwords.setup_app(app)
+    pool = app.extensions["password_hasher"]
+    assert not pool.check_needs_rehash(FAST_HASHER.hash("password"))
+    # hashes made under other parameters get upgraded on login
+    assert pool.check_needs_rehash(PasswordHasher(time_cost=2).hash("password"))
+
+
+def test_calibrate_stops_past_target():
+    benchmarks = list(
+        calibrate_hash_parameters(
+            0, memory_costs=(8,), parallelisms=(1,), max_time_cost=3, samples=1
+        )
+    )
+    # every verify takes longer than no time at all
+    assert [benchmark.parameters for benchmark in benchmarks] == [HashParameters(1, 8, 1)]
+
+
+def test_recommend():
+    benchmarks = [
+        HashBenchmark(HashParameters(3, 19456, 1), 0.2),
+        HashBenchmark(HashParameters(1, 65536, 4), 0.2),
+        HashBenchmark(HashParameters(1, 65536, 1), 0.4),
+        HashBenchmark(HashParameters(2, 65536, 1), 0.8),
+    ]
+    assert recommend_hash_parameters(benchmarks, 0.5) == HashParameters(1, 65536, 1)
+    assert recommend_hash_parameters(benchmarks, 0.1) is None
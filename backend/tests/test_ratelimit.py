@@ -0,0 +1,119 @@
+import time
+
+from flask import Flask
+
+from app import ratelimit
+from app.ratelimit import RATE_LIMIT_DECISIONS, RATE_LIMIT_EVICTIONS, TokenBucketLimiter
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def make_limiter(**kwargs):
+    clock = Clock()
+    kwargs = {"burst": 2, "rate": 1, "max_keys": 10, **kwargs}
+    return TokenBucketLimiter("test", clock=clock, **kwargs), clock
+
+
+class TestTokenBucketLimiter:
+    @staticmethod
+    def test_burst_then_refill():
+        limiter, clock = make_limiter()
+        assert limiter.allow("key")
+        assert limiter.allow("key")
+        assert not limiter.allow("key")
+        clock.now += 0.5
+        assert not limiter.allow("key")
+        clock.now += 0.5
+        assert limiter.allow("key")
+
+    @staticmethod
+    def test_refill_capped_at_burst():
+        limiter, clock = make_limiter()
+        limiter.allow("key")
+        clock.now += 100
+        assert limiter.allow("key")
+        assert limiter.allow("key")
+        assert not limiter.allow("key")
+
+    @staticmethod
+    def test_keys_independent():
+        limiter, _ = make_limiter(burst=1)
+        assert limiter.allow("a")
+        assert not limiter.allow("a")
+        assert limiter.allow("b")
+
+    @staticmethod
+    def test_eviction():
+        limiter, _ = make_limiter(burst=1, max_keys=2)
+        evictions = RATE_LIMIT_EVICTIONS.get(limit="test")
+        limiter.allow("a")
+        limiter.allow("b")
+        # using a keeps it, b is now the least recently used
+        limiter.allow("a")
+        limiter.allow("c")
+        # the overflow and a batch of one, equally drained so the least recently used
+        assert RATE_LIMIT_EVICTIONS.get(limit="test") == evictions + 2
+        assert limiter.allow("b")
+        assert not limiter.allow("c")
+
+    @staticmethod
+    def test_eviction_keeps_drained():
+        limiter, clock = make_limiter(burst=2, rate=0.1, max_keys=2)
+        limiter.allow("drained")
+        limiter.allow("drained")
+        clock.now += 1
+        for key in ("x", "y", "z"):
+            limiter.allow(key)
+        assert not limiter.allow("drained")
+
+    @staticmethod
+    def test_eviction_prefers_fullest():
+        limiter, clock = make_limiter(burst=3, max_keys=10)
+        for key in range(9):
+            for _ in range(3):
+                limiter.allow(key)
+        clock.now += 0.5
+        # used more recently, but fuller
+        limiter.allow("fuller")
+        clock.now += 0.5
+        limiter.allow("new")
+        for key in range(9):
+            assert limiter.allow(key)
+            assert not limiter.allow(key)
+
+    @staticmethod
+    def test_eviction_amortized():
+        def churn(max_keys):
+            limiter, _ = make_limiter(max_keys=max_keys)
+            for key in range(max_keys):
+                limiter.allow(key)
+            start = time.perf_counter()
+            for key in range(max_keys, max_keys + 10000):
+                limiter.allow(key)
+            return time.perf_counter() - start
+
+        # a scan of the whole table for every new key makes this about a hundred times slower
+        assert churn(10000) < churn(100) * 5
+
+    @staticmethod
+    def test_counters():
+        limiter, _ = make_limiter(burst=1)
+        allowed = RATE_LIMIT_DECISIONS.get(limit="test", result="allowed")
+        denied = RATE_LIMIT_DECISIONS.get(limit="test", result="denied")
+        limiter.allow("key")
+        limiter.allow("key")
+        assert RATE_LIMIT_DECISIONS.get(limit="test", result="allowed") == allowed + 1
+        assert RATE_LIMIT_DECISIONS.get(limit="test", result="denied") == denied + 1
+
+
+def test_zero_burst_disables():
+    app = Flask("test")
+    app.config.update(LOGIN_USERNAME_BURST=0)
+    ratelimit.setup_app(app)
+    assert set(app.extensions["login_limiters"]) == {"address"}